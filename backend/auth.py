@@ -0,0 +1,111 @@
+import os
+import time
+import logging
+import secrets
+import threading
+from collections import OrderedDict
+
+import requests
+from google.oauth2 import id_token
+from google.auth.transport.requests import Request
+from google_auth_oauthlib.flow import Flow
+
+from take_mails import SCOPES
+
+logger = logging.getLogger(__name__)
+
+# Frontend'in Google ile giriş için kullandığı OAuth istemci ID'si; ID token'ların audience'ı olmalı
+GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "")
+# Gmail erişimi için web OAuth istemcisinin bilgileri
+CLIENT_SECRETS_FILE = os.getenv("GOOGLE_CLIENT_SECRETS_FILE", "credentials.json")
+# Google onaydan sonra kodu (code, state) sorgu parametreleriyle bu frontend adresine döndürür
+OAUTH_REDIRECT_URI = os.getenv("GMAIL_OAUTH_REDIRECT_URI", "http://localhost:3001")
+# Doğrulanmış ID token'lar bu kadar süre (ve en fazla token'ın kendi süresi kadar) tekrar doğrulanmaz
+ID_TOKEN_CACHE_SECONDS = int(os.getenv("ID_TOKEN_CACHE_SECONDS", "300"))
+ID_TOKEN_CACHE_SIZE = 10000
+
+GOOGLE_ISSUERS = {"accounts.google.com", "https://accounts.google.com"}
+
+
+class AuthenticationError(Exception):
+    """İstek doğrulanmış bir Google hesabına bağlanamadı."""
+
+
+class IdTokenVerifier:
+    """
+    Google ID token'larını (imza, audience, issuer, süre) doğrular ve e-posta adresini döndürür.
+    Google'ın imza anahtarları tek bir HTTP oturumuyla çekilir; doğrulanan token'lar kısa süre önbellekte tutulur.
+    """
+
+    def __init__(self, client_id=GOOGLE_CLIENT_ID, cache_seconds=ID_TOKEN_CACHE_SECONDS):
+        self.client_id = client_id
+        self.request = Request(session=requests.Session())
+        self.cache_seconds = cache_seconds
+        # token -> (e-posta, geçerlilik sonu); en eski kayıt önce atılır
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def verify(self, token):
+        if not self.client_id:
+            raise AuthenticationError("GOOGLE_CLIENT_ID ayarlanmadığı için kimlik doğrulanamıyor.")
+        now = time.time()
+        with self.lock:
+            cached = self.cache.get(token)
+        if cached and cached[1] > now:
+            return cached[0]
+
+        try:
+            claims = id_token.verify_oauth2_token(token, self.request, self.client_id)
+        except ValueError as e:
+            raise AuthenticationError(f"Geçersiz kimlik token'ı: {str(e)}") from e
+        if claims.get("iss") not in GOOGLE_ISSUERS:
+            raise AuthenticationError("Kimlik token'ı Google tarafından verilmemiş.")
+        if not claims.get("email") or not claims.get("email_verified"):
+            raise AuthenticationError("Kimlik token'ında doğrulanmış e-posta adresi yok.")
+
+        email = claims["email"].lower()
+        with self.lock:
+            self.cache[token] = (email, min(claims["exp"], now + self.cache_seconds))
+            while len(self.cache) > ID_TOKEN_CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return email
+
+
+def bearer_token(authorization):
+    """Authorization başlığından Bearer token'ı ayıklar."""
+    if not authorization:
+        raise AuthenticationError("Lütfen önce Google hesabınızla giriş yapınız.")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise AuthenticationError("Authorization başlığı 'Bearer <token>' biçiminde olmalı.")
+    return token.strip()
+
+
+def _flow(state, code_verifier=None):
+    # PKCE: doğrulayıcı ilk adımda üretilir, kodu token'a çevirirken aynısı verilir
+    return Flow.from_client_secrets_file(
+        CLIENT_SECRETS_FILE, SCOPES, redirect_uri=OAUTH_REDIRECT_URI, state=state,
+        code_verifier=code_verifier, autogenerate_code_verifier=code_verifier is None
+    )
+
+
+def start_authorization(user_email):
+    """
+    Kullanıcı için Gmail yetkilendirme adresini üretir. (adres, state, code_verifier) döndürür;
+    state ve code_verifier yetkilendirme tamamlanana kadar kullanıcının oturum kaydında saklanmalı.
+    """
+    flow = _flow(secrets.token_urlsafe(32))
+    auth_url, state = flow.authorization_url(
+        access_type="offline",
+        prompt="consent",
+        include_granted_scopes="true",
+        login_hint=user_email
+    )
+    return auth_url, state, flow.code_verifier
+
+
+def finish_authorization(code, state, code_verifier):
+    """Yetkilendirme kodunu token'a çevirir ve Gmail kimlik bilgilerini döndürür."""
+    flow = _flow(state, code_verifier)
+    flow.fetch_token(code=code)
+    return flow.credentials
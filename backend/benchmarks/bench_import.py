@@ -0,0 +1,250 @@
+"""
+Import hattı ve listeleme endpoint'leri için çevrimdışı benchmark.
+
+Gmail yerine kaydedilmiş payload'ları geri oynatan FakeGmailService, HF yerine yerel stub
+sunucusu, Atlas yerine mongomock (veya --mongo-uri ile yerel mongod) kullanır. Her mail
+sayısı için import'u ve kategori listelemeyi API üzerinden çalıştırıp aşama bazlı süreleri,
+throughput'u, p50/p99 gecikmeleri ve en yüksek bellek kullanımını raporlar.
+
+mongomock upsert ve sıralamaları indeks kullanmadan yaptığından mongo_write ve listeleme
+süreleri büyük mail sayılarında gerçeği yansıtmaz; bu aşamalar için --mongo-uri kullanın.
+
+    python benchmarks/bench_import.py --sizes 100,1000,10000 --hf-latency 0.02
+    python benchmarks/bench_import.py --corpus payloads.jsonl --mongo-uri mongodb://localhost:27017
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tracemalloc
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, ".."))
+sys.path.insert(0, BENCHMARK_DIR)
+
+from fake_gmail import FakeGmailService  # noqa: E402
+from hf_stub_server import start_stub_server  # noqa: E402
+from bench_mime_parser import synthetic_corpus, load_corpus  # noqa: E402
+
+BENCHMARK_EMAIL = "benchmark@example.com"
+LIST_PAGE_SIZE = 50
+
+
+def configure_environment(args):
+    """api modülü ortam değişkenlerini import sırasında okuduğu için önce ayarlanır."""
+    if args.mongo_uri:
+        os.environ["MONGODB_URI"] = args.mongo_uri
+        os.environ["MONGODB_MOCK"] = "0"
+        os.environ["MONGODB_DB_NAME"] = "gmail_categorizer_benchmark"
+    else:
+        os.environ["MONGODB_MOCK"] = "1"
+    os.environ["CLASSIFIER_BACKEND"] = "hf"
+    os.environ.setdefault("HF_TOKEN", "benchmark")
+    os.environ["IMPORT_FETCH_MODE"] = args.fetch_mode
+    os.environ["GMAIL_QUOTA_UNITS_PER_SECOND"] = str(args.gmail_quota)
+
+    server, url, state = start_stub_server(latency=args.hf_latency)
+    os.environ["HF_API_URL"] = url
+    return server, state
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def _histogram_quantile(q, buckets):
+    """Kümülatif histogram kovalarından (le, sayı) doğrusal interpolasyonla yüzdelik tahmini."""
+    total = buckets[-1][1] if buckets else 0
+    if not total:
+        return 0.0
+    rank = q * total
+    previous_le, previous_count = 0.0, 0.0
+    for le, count in buckets:
+        if count >= rank:
+            if le == float("inf"):
+                return previous_le
+            return previous_le + (le - previous_le) * (rank - previous_count) / max(count - previous_count, 1e-9)
+        previous_le, previous_count = le, count
+    return previous_le
+
+
+def stage_snapshot():
+    """Aşama histogramlarının anlık değerleri: {aşama: {"sum", "count", "buckets": {le: sayı}}}."""
+    from metrics import STAGE_SECONDS
+    stages = {}
+    for metric in STAGE_SECONDS.collect():
+        for sample in metric.samples:
+            stage = stages.setdefault(sample.labels["stage"], {"sum": 0.0, "count": 0.0, "buckets": {}})
+            if sample.name.endswith("_bucket"):
+                stage["buckets"][float(sample.labels["le"])] = sample.value
+            elif sample.name.endswith("_sum"):
+                stage["sum"] = sample.value
+            elif sample.name.endswith("_count"):
+                stage["count"] = sample.value
+    return stages
+
+
+def stage_report(before, after):
+    report = {}
+    for name, stage in after.items():
+        previous = before.get(name, {"sum": 0.0, "count": 0.0, "buckets": {}})
+        count = stage["count"] - previous["count"]
+        if not count:
+            continue
+        buckets = sorted(
+            (le, value - previous["buckets"].get(le, 0.0)) for le, value in stage["buckets"].items()
+        )
+        report[name] = {
+            "calls": int(count),
+            "total_seconds": stage["sum"] - previous["sum"],
+            "p50_ms": _histogram_quantile(0.5, buckets) * 1000,
+            "p99_ms": _histogram_quantile(0.99, buckets) * 1000,
+        }
+    return report
+
+
+def reset_database(api):
+    from categorize_mails import set_cache_collection, set_rules_collection
+    api.mails_collection.delete_many({})
+    api.deleted_mails_collection.delete_many({})
+    api.session_collection.delete_many({"email": BENCHMARK_EMAIL})
+    # Önceki turun önbelleği ve öğrenilmiş göndericileri sonuçları etkilemesin
+    set_cache_collection(api.db["classification_cache"])
+    set_rules_collection(api.mails_collection)
+
+
+class _MemoryTracker:
+    """tracemalloc ile bloğun en yüksek Python bellek kullanımını ölçer (kapalıysa None)."""
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.peak_mb = None
+
+    def __enter__(self):
+        if self.enabled:
+            tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.enabled:
+            self.peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+
+
+def run_size(api, client, corpus, size, gmail_latency, trace_memory=False):
+    reset_database(api)
+    service = FakeGmailService(corpus, size, email_address=BENCHMARK_EMAIL, latency=gmail_latency)
+    api.session_manager.get_service = lambda user_email: service
+    # Google ID token doğrulaması benchmark hesabıyla değiştirilir
+    api.app.dependency_overrides[api.get_user_email] = lambda: BENCHMARK_EMAIL
+
+    before = stage_snapshot()
+    with _MemoryTracker(trace_memory) as import_memory:
+        start = time.perf_counter()
+        response = client.post("/mails/insert_mails_into_database")
+        import_seconds = time.perf_counter() - start
+    if response.status_code != 200:
+        raise RuntimeError(f"Import başarısız: {response.status_code} {response.text}")
+    import_stages = stage_report(before, stage_snapshot())
+
+    # Her kategori imleçle sonuna kadar sayfalanır
+    from mail_classifier import LABELS
+    latencies = []
+    with _MemoryTracker(trace_memory) as list_memory:
+        list_start = time.perf_counter()
+        for category in ["all"] + LABELS:
+            cursor = None
+            while True:
+                params = {"limit": LIST_PAGE_SIZE}
+                if cursor:
+                    params["cursor"] = cursor
+                request_start = time.perf_counter()
+                page = client.get(f"/mails/{category}", params=params)
+                latencies.append(time.perf_counter() - request_start)
+                if page.status_code == 404 and not cursor:
+                    # Bu kategoride hiç mail yok
+                    break
+                if page.status_code != 200:
+                    raise RuntimeError(f"Listeleme başarısız ({category}): {page.status_code} {page.text}")
+                cursor = page.json()["next_cursor"]
+                if not cursor:
+                    break
+        list_seconds = time.perf_counter() - list_start
+
+    return {
+        "mails": size,
+        "import": {
+            "seconds": import_seconds,
+            "mails_per_second": size / import_seconds,
+            "peak_memory_mb": import_memory.peak_mb,
+            "gmail_calls": dict(service.calls),
+            "stages": import_stages,
+        },
+        "listing": {
+            "requests": len(latencies),
+            "requests_per_second": len(latencies) / list_seconds,
+            "p50_ms": _percentile(latencies, 0.5) * 1000,
+            "p99_ms": _percentile(latencies, 0.99) * 1000,
+            "peak_memory_mb": list_memory.peak_mb,
+        },
+    }
+
+
+def _format_memory(peak_mb):
+    return f"{peak_mb:.1f} MB" if peak_mb is not None else "ölçülmedi (--trace-memory)"
+
+
+def print_result(result):
+    imported, listing = result["import"], result["listing"]
+    print(f"\n=== {result['mails']} mail ===")
+    print(f"Import: {imported['seconds']:.2f} sn, {imported['mails_per_second']:.1f} mail/sn, "
+          f"en yüksek bellek {_format_memory(imported['peak_memory_mb'])}, Gmail çağrıları {imported['gmail_calls']}")
+    print(f"  {'aşama':<14}{'çağrı':>8}{'toplam sn':>12}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, stage in sorted(imported["stages"].items(), key=lambda item: -item[1]["total_seconds"]):
+        print(f"  {name:<14}{stage['calls']:>8}{stage['total_seconds']:>12.3f}"
+              f"{stage['p50_ms']:>10.2f}{stage['p99_ms']:>10.2f}")
+    print(f"Listeleme: {listing['requests']} istek, {listing['requests_per_second']:.1f} istek/sn, "
+          f"p50 {listing['p50_ms']:.2f} ms, p99 {listing['p99_ms']:.2f} ms, "
+          f"en yüksek bellek {_format_memory(listing['peak_memory_mb'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000", help="Virgülle ayrılmış mail sayıları")
+    parser.add_argument("--corpus", help="Kaydedilmiş payload dosyası (JSON Lines); yoksa örnek korpus")
+    parser.add_argument("--hf-latency", type=float, default=0.02, help="HF stub istek gecikmesi (sn)")
+    parser.add_argument("--gmail-latency", type=float, default=0.0, help="Gmail list/batch çağrı gecikmesi (sn)")
+    parser.add_argument("--gmail-quota", type=float, default=250,
+                        help="Hesap başına Gmail kota birimi / sn (gerçek sınır 250; 0 ise sınırsız)")
+    parser.add_argument("--fetch-mode", default="full", choices=["full", "metadata"])
+    parser.add_argument("--mongo-uri", help="mongomock yerine kullanılacak yerel mongod adresi")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="tracemalloc ile aşama bazlı en yüksek bellek ölçülür (süreleri belirgin şekilde uzatır)")
+    parser.add_argument("--json", help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    server, stub_state = configure_environment(args)
+    import logging
+    logging.disable(logging.WARNING)
+    import api
+    from fastapi.testclient import TestClient
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(4)
+    client = TestClient(api.app)
+    results = []
+    for size in (int(value) for value in args.sizes.split(",")):
+        result = run_size(api, client, corpus, size, args.gmail_latency, trace_memory=args.trace_memory)
+        print_result(result)
+        results.append(result)
+
+    print(f"\nHF stub: {stub_state.requests} istek, en fazla {stub_state.max_in_flight} eş zamanlı; "
+          f"süreç en yüksek RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+    server.shutdown()
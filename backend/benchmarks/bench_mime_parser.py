@@ -0,0 +1,122 @@
+"""
+MIME ayrıştırıcı için mikro benchmark.
+
+Kaydedilmiş Gmail payload'ları (messages.get format=full yanıtları, JSON Lines) üzerinde
+parse_mail süresini ölçer. Dosya verilmezse farklı yapıdaki örnek mesajlardan bir korpus üretilir.
+
+    python benchmarks/bench_mime_parser.py --record payloads.jsonl --count 200   # Gmail'den kaydet
+    python benchmarks/bench_mime_parser.py --corpus payloads.jsonl
+"""
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from take_mails import parse_mail  # noqa: E402
+
+
+def _encode(text, charset="utf-8"):
+    return base64.urlsafe_b64encode(text.encode(charset)).decode("ascii")
+
+
+def _text_part(mime_type, text, charset="utf-8"):
+    return {
+        "mimeType": mime_type,
+        "headers": [{"name": "Content-Type", "value": f'{mime_type}; charset="{charset}"'}],
+        "body": {"size": len(text), "data": _encode(text, charset)},
+    }
+
+
+def _attachment(filename, mime_type, size):
+    return {
+        "mimeType": mime_type,
+        "filename": filename,
+        "headers": [{"name": "Content-Disposition", "value": f'attachment; filename="{filename}"'}],
+        "body": {"size": size, "attachmentId": f"att-{filename}"},
+    }
+
+
+def synthetic_corpus(size=1000):
+    """Düz metin, alternative, ekli/iç içe ve Türkçe charset'li mesaj yapılarından korpus üretir."""
+    html = "<html><body>" + "<p>Kampanya detayları ve indirim fırsatları</p>" * 200 + "</body></html>"
+    text = "Kampanya detayları ve indirim fırsatları\n" * 200
+    shapes = [
+        _text_part("text/plain", text),
+        {"mimeType": "multipart/alternative", "parts": [_text_part("text/plain", text), _text_part("text/html", html)]},
+        {"mimeType": "multipart/mixed", "parts": [
+            {"mimeType": "multipart/related", "parts": [
+                {"mimeType": "multipart/alternative", "parts": [_text_part("text/plain", text), _text_part("text/html", html)]},
+                _attachment("logo.png", "image/png", 4096),
+            ]},
+            _attachment("fatura.pdf", "application/pdf", 250000),
+        ]},
+        {"mimeType": "multipart/alternative", "parts": [
+            _text_part("text/plain", "Sayın müşterimiz, sipariş özetiniz ektedir.\n" * 50, "iso-8859-9"),
+            _text_part("text/html", "<p>Sayın müşterimiz, sipariş özetiniz ektedir.</p>" * 50, "iso-8859-9"),
+        ]},
+    ]
+    headers = [
+        {"name": "From", "value": "Mağaza <kampanya@ornek.com>"},
+        {"name": "Subject", "value": "Haftalık fırsatlar"},
+        {"name": "Date", "value": "Mon, 12 Oct 2026 10:00:00 +0000"},
+    ]
+    return [
+        {"id": f"m{i}", "snippet": "Kampanya detayları", "payload": {**shapes[i % len(shapes)], "headers": headers}}
+        for i in range(size)
+    ]
+
+
+def load_corpus(path):
+    with open(path, encoding="utf-8") as corpus_file:
+        return [json.loads(line) for line in corpus_file if line.strip()]
+
+
+def record_corpus(path, count):
+    """Bağlı Gmail hesabının son mesajlarını ham payload olarak kaydeder."""
+    from take_mails import authenticate_gmail, list_message_ids, fetch_messages, days_query
+    service = authenticate_gmail()
+    msg_ids = []
+    for msg_id in list_message_ids(service, days_query(30)):
+        msg_ids.append(msg_id)
+        if len(msg_ids) >= count:
+            break
+    with open(path, "w", encoding="utf-8") as corpus_file:
+        for mail_data in fetch_messages(service, msg_ids):
+            corpus_file.write(json.dumps(mail_data, ensure_ascii=False) + "\n")
+    print(f"{len(msg_ids)} payload kaydedildi: {path}")
+
+
+def run(corpus, rounds=5):
+    durations = []
+    for _ in range(rounds):
+        for mail_data in corpus:
+            start = time.perf_counter()
+            parse_mail(mail_data)
+            durations.append(time.perf_counter() - start)
+    durations.sort()
+    total = sum(durations)
+    print(f"Mesaj sayısı: {len(corpus)} x {rounds} tur")
+    print(f"Toplam: {total:.3f} sn, mesaj/sn: {len(durations) / total:,.0f}")
+    print(f"Ortalama: {statistics.mean(durations) * 1e6:.1f} µs, "
+          f"p50: {durations[len(durations) // 2] * 1e6:.1f} µs, "
+          f"p99: {durations[int(len(durations) * 0.99)] * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Kaydedilmiş payload dosyası (JSON Lines)")
+    parser.add_argument("--record", help="Gmail'den payload kaydedilecek dosya")
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--size", type=int, default=1000, help="Örnek korpus boyutu")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.record:
+        record_corpus(args.record, args.count)
+    else:
+        run(load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.size), args.rounds)
@@ -0,0 +1,136 @@
+"""
+Gmail API servis nesnesinin bellek içi taklidi. Kaydedilmiş (veya örnek) payload'ları
+istenen sayıda mesaja çoğaltarak geri oynatır; list, get (full / metadata), batch,
+getProfile, watch ve history.list çağrılarını destekler.
+"""
+import copy
+import time
+import threading
+
+
+class _Request:
+    def __init__(self, function):
+        self.function = function
+
+    def execute(self):
+        return self.function()
+
+
+class _BatchRequest:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request, request_id))
+
+    def execute(self):
+        if self.service.latency:
+            time.sleep(self.service.latency)
+        for request, request_id in self.requests:
+            self.callback(request_id, request.function(), None)
+
+
+class _History:
+    def __init__(self, service):
+        self.service = service
+
+    def list(self, userId, startHistoryId, historyTypes=None, maxResults=500, pageToken=None, labelId=None):
+        def run():
+            with self.service.lock:
+                records = [record for record in self.service.history_log if int(record["id"]) > int(startHistoryId)]
+                return {"history": records, "historyId": str(self.service.history_id)}
+        return _Request(run)
+
+
+class FakeGmailService:
+    """
+    corpus: messages.get(format='full') yanıtlarından oluşan liste. Mesaj i, corpus[i % len(corpus)]
+    payload'ının kopyasıdır; konu ve snippet'e numara eklenir ki her mail farklı sınıflandırma metni üretsin.
+    latency: her list / batch çağrısına eklenen gecikme (sn).
+    """
+
+    def __init__(self, corpus, message_count, email_address="benchmark@example.com", latency=0.0):
+        self.corpus = corpus
+        self.message_count = message_count
+        self.email_address = email_address
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.history_log = []
+        self.history_id = 1000
+        self.calls = {"list": 0, "get_full": 0, "get_metadata": 0, "batch": 0}
+
+    def _count(self, call):
+        with self.lock:
+            self.calls[call] += 1
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def history(self):
+        return _History(self)
+
+    def add_messages(self, count):
+        """Gelen kutusuna yeni mesajlar ekler ve messageAdded geçmiş kaydı üretir."""
+        with self.lock:
+            new_ids = [f"msg{index:07d}" for index in range(self.message_count, self.message_count + count)]
+            self.message_count += count
+            self.history_id += 1
+            self.history_log.append({
+                "id": str(self.history_id),
+                "messagesAdded": [{"message": {"id": msg_id}} for msg_id in new_ids]
+            })
+        return new_ids
+
+    def watch(self, userId, body):
+        expiration_ms = int((time.time() + 7 * 24 * 3600) * 1000)
+        return _Request(lambda: {"historyId": str(self.history_id), "expiration": str(expiration_ms)})
+
+    def getProfile(self, userId):
+        return _Request(lambda: {"emailAddress": self.email_address, "historyId": str(self.history_id)})
+
+    def list(self, userId, q=None, maxResults=100, pageToken=None):
+        def run():
+            if self.latency:
+                time.sleep(self.latency)
+            self._count("list")
+            start = int(pageToken or 0)
+            end = min(start + maxResults, self.message_count)
+            result = {"messages": [{"id": f"msg{index:07d}"} for index in range(start, end)]}
+            if end < self.message_count:
+                result["nextPageToken"] = str(end)
+            return result
+        return _Request(run)
+
+    def get(self, userId, id, format="full", metadataHeaders=None):
+        def run():
+            index = int(id[3:])
+            mail_data = copy.deepcopy(self.corpus[index % len(self.corpus)])
+            mail_data["id"] = id
+            mail_data["snippet"] = f"{mail_data.get('snippet', '')} #{index}"
+            payload = mail_data.setdefault("payload", {})
+            headers = [
+                {**header, "value": f"{header['value']} #{index}"} if header.get("name", "").lower() == "subject" else header
+                for header in payload.get("headers", [])
+            ]
+            if format == "metadata":
+                self._count("get_metadata")
+                wanted = {name.lower() for name in metadataHeaders or []}
+                mail_data["payload"] = {
+                    "mimeType": payload.get("mimeType", ""),
+                    "headers": [header for header in headers if header.get("name", "").lower() in wanted]
+                }
+            else:
+                self._count("get_full")
+                payload["headers"] = headers
+            return mail_data
+        return _Request(run)
+
+    def new_batch_http_request(self, callback):
+        self._count("batch")
+        return _BatchRequest(self, callback)
+
@@ -0,0 +1,57 @@
+"""
+Gmail watch bildirimlerini Pub/Sub push formatında gönderen sahte yayıncı.
+
+Gerçek Pub/Sub aboneliği olmadan /mails/push/gmail endpoint'ini ve debounce davranışını
+denemek için kullanılır; --count ile art arda bildirim patlaması üretilebilir.
+
+    python benchmarks/fake_pubsub_publisher.py --email kullanici@gmail.com --history-id 12345 --count 20
+"""
+import json
+import time
+import uuid
+import base64
+import argparse
+from datetime import datetime, timezone
+
+import requests
+
+DEFAULT_URL = "http://127.0.0.1:8000/mails/push/gmail"
+SUBSCRIPTION = "projects/local/subscriptions/gmail-push"
+
+
+def make_push_envelope(email_address, history_id, subscription=SUBSCRIPTION):
+    """Pub/Sub'ın push aboneliğine gönderdiği gövdenin aynısını üretir."""
+    data = json.dumps({"emailAddress": email_address, "historyId": int(history_id)}).encode("utf-8")
+    return {
+        "message": {
+            "data": base64.b64encode(data).decode("ascii"),
+            "messageId": uuid.uuid4().hex,
+            "publishTime": datetime.now(timezone.utc).isoformat()
+        },
+        "subscription": subscription
+    }
+
+
+def publish(email_address, history_id, url=DEFAULT_URL, token=None, session=None):
+    params = {"token": token} if token else None
+    response = (session or requests).post(url, params=params, json=make_push_envelope(email_address, history_id))
+    response.raise_for_status()
+    return response.status_code
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--history-id", type=int, required=True)
+    parser.add_argument("--token", help="GMAIL_PUSH_VERIFICATION_TOKEN değeri")
+    parser.add_argument("--count", type=int, default=1, help="Gönderilecek bildirim sayısı")
+    parser.add_argument("--interval", type=float, default=0.1, help="Bildirimler arası bekleme (sn)")
+    args = parser.parse_args()
+
+    with requests.Session() as session:
+        for index in range(args.count):
+            status = publish(args.email, args.history_id + index, args.url, args.token, session)
+            print(f"historyId {args.history_id + index} gönderildi ({status})")
+            if index + 1 < args.count:
+                time.sleep(args.interval)
@@ -0,0 +1,114 @@
+"""
+HF Inference API'nin zero-shot uç noktasını taklit eden yerel sunucu.
+
+Gerçek API'ye gitmeden istemcinin tekrar deneme, zaman aşımı ve eş zamanlılık davranışını
+denemek ve import hattını ölçmek için kullanılır. Skorlar metnin hash'inden deterministik üretilir.
+
+    python benchmarks/hf_stub_server.py --port 8080 --latency 0.05 --loading-seconds 5
+    HF_API_URL=http://127.0.0.1:8080/models uvicorn api:app
+"""
+import json
+import time
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubState:
+    def __init__(self, latency=0.0, loading_seconds=0.0, rate_limit_every=0, retry_after=1):
+        self.latency = latency
+        self.loading_until = time.monotonic() + loading_seconds
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+
+def stub_scores(text, labels):
+    """Metin ve etiketlerden deterministik, toplamı 1 olan skorlar üretir."""
+    weights = [
+        int(hashlib.md5(f"{text}|{label}".encode("utf-8")).hexdigest()[:8], 16) + 1
+        for label in labels
+    ]
+    total = sum(weights)
+    ranked = sorted(zip(labels, (weight / total for weight in weights)), key=lambda item: item[1], reverse=True)
+    return {"labels": [label for label, _ in ranked], "scores": [score for _, score in ranked]}
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Başlık ve gövde ayrı yazıldığından Nagle + gecikmeli ACK her isteğe ~40 ms ekliyor
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, headers=None):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            with state.lock:
+                state.requests += 1
+                request_number = state.requests
+                state.in_flight += 1
+                state.max_in_flight = max(state.max_in_flight, state.in_flight)
+            try:
+                remaining = state.loading_until - time.monotonic()
+                if remaining > 0:
+                    self._send(503, {"error": "Model is currently loading", "estimated_time": remaining})
+                    return
+                if state.rate_limit_every and request_number % state.rate_limit_every == 0:
+                    self._send(429, {"error": "Rate limit reached"}, {"Retry-After": str(state.retry_after)})
+                    return
+                if state.latency:
+                    time.sleep(state.latency)
+                labels = payload.get("parameters", {}).get("candidate_labels", [])
+                self._send(200, {"sequence": payload.get("inputs", ""), **stub_scores(payload.get("inputs", ""), labels)})
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+    return Handler
+
+
+def start_stub_server(port=0, **options):
+    """
+    Sunucuyu arka plan thread'inde başlatır. (sunucu, HF_API_URL olarak verilecek adres, durum) döndürür.
+    İş bitince server.shutdown() çağrılmalı.
+    """
+    state = StubState(**options)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="hf-stub", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/models", state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="İstek başına gecikme (sn)")
+    parser.add_argument("--loading-seconds", type=float, default=0.0, help="Bu süre boyunca 503 + estimated_time döner")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Her N. isteğe 429 + Retry-After döner")
+    args = parser.parse_args()
+
+    server, url, _ = start_stub_server(
+        args.port, latency=args.latency, loading_seconds=args.loading_seconds,
+        rate_limit_every=args.rate_limit_every
+    )
+    print(f"HF stub sunucusu çalışıyor: HF_API_URL={url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,45 +1,167 @@
-from take_mails import take_daily_mails
+from take_mails import iter_daily_mails, iter_mails
 from mail_classifier import MailClassifier
-from pymongo import MongoClient
+from classification_cache import create_cache
+from sender_rules import SenderRules, SENDER_RULES_ENABLED, MODEL_SOURCE, apply_list_unsubscribe_hint
+from metrics import timed, RULE_MATCHES
+from mail_storage import storage_date
+from text_preprocessing import prepare_for_classification
 import os
+import html
 from dotenv import load_dotenv
 
 load_dotenv()
 hf_token = os.getenv("HF_TOKEN")
 
-categorized_mails = []
+# Sınıflandırıcıya tek seferde gönderilecek mail sayısı
+CLASSIFY_CHUNK_SIZE = int(os.getenv("CLASSIFY_CHUNK_SIZE", "16"))
 
 collection = None
 
-def categorizer_mails():
-    classifier = MailClassifier(hf_token)
-    global categorized_mails 
-    categorized_mails = []
-    list_of_daily_mails, snippet = take_daily_mails()
-    
-    for item in list_of_daily_mails:
-        # İçerik kontrolü - text alanını kaldırıyoruz
-        content_to_classify = item.get('content', '') or item.get('body', '') or item.get('snippet', '')
-        
-        result = classifier.classify_mail(content_to_classify)
-        mail_data = {
+_classifier = None
+_cache_collection = None
+_sender_rules = None
+_rules_collection = None
+
+
+def set_cache_collection(cache_collection):
+    """CLASSIFICATION_CACHE_STORE=mongo iken kalıcı önbellek olarak kullanılacak koleksiyonu belirler."""
+    global _cache_collection, _classifier
+    _cache_collection = cache_collection
+    _classifier = None
+
+
+def get_classifier():
+    """Model yükleme maliyeti her import'ta ödenmesin diye sınıflandırıcı bir kez oluşturulur."""
+    global _classifier
+    if _classifier is None:
+        _classifier = MailClassifier(hf_token, cache=create_cache(_cache_collection))
+    return _classifier
+
+
+def set_rules_collection(mails_collection):
+    """Gönderici kategorilerinin öğrenileceği mail koleksiyonunu belirler."""
+    global _rules_collection, _sender_rules
+    _rules_collection = mails_collection
+    _sender_rules = None
+
+
+def get_sender_rules():
+    """Kural katmanını bir kez oluşturur; SENDER_RULES_ENABLED=0 ise None döner."""
+    global _sender_rules
+    if not SENDER_RULES_ENABLED:
+        return None
+    if _sender_rules is None:
+        _sender_rules = SenderRules.from_file(collection=_rules_collection)
+    return _sender_rules
+
+
+def metadata_text(item):
+    """Gövdesi olmayan mail için sınıflandırma metni: konu ve snippet (Gmail snippet'i HTML escape'lidir)."""
+    subject = item.get('subject', '')
+    snippet = html.unescape(item.get('snippet', ''))
+    return f"{subject}\n{snippet}".strip() if subject != snippet else snippet.strip()
+
+
+def needs_body(item, user_email=None):
+    """
+    Mail yalnızca meta veriyle çekildiyse ve bir kurala uymuyorsa True döner. Modele giden her
+    mail gövdesiyle sınıflandırılır; meta veri sadece listeleme ve kural eşleştirmesi için yeterlidir.
+    """
+    if item.get('content') is not None:
+        return False
+    rules = get_sender_rules()
+    return rules is None or rules.match(item, user_email) is None
+
+
+def rule_result(category, source):
+    return {
+        'predicted_class': category,
+        'confidence_score': 1.0,
+        'all_scores': {category: 1.0},
+        'classified_by': source
+    }
+
+
+def classify_chunk(classifier, items, rules=None, user_email=None):
+    """
+    Bir grup ayrıştırılmış maili tek seferde sınıflandırıp veritabanı formatında döndürür.
+    Gönderici kurallarına (ve user_email'in öğrenilmiş göndericilerine) uyan mailler modele gönderilmez;
+    List-Unsubscribe başlığı olanlarda modelin abonelik skoru güçlendirilir.
+    """
+    rules = rules or get_sender_rules()
+    results = [None] * len(items)
+    model_indexes = []
+    with timed("classify", items=len(items)):
+        for index, item in enumerate(items):
+            match = rules.match(item, user_email) if rules is not None else None
+            if match:
+                results[index] = rule_result(*match)
+                RULE_MATCHES.labels(match[1]).inc()
+            else:
+                model_indexes.append(index)
+
+        if model_indexes:
+            # HTML görünen metne indirgenip kısaltılır; gövde yoksa veya boş kalırsa konu + snippet kullanılır
+            contents = [
+                prepare_for_classification(items[index].get('content') or '')
+                or metadata_text(items[index])
+                for index in model_indexes
+            ]
+            for index, result in zip(model_indexes, classifier.classify_mails(contents)):
+                result = {**result, 'classified_by': MODEL_SOURCE}
+                if rules is not None and items[index].get('list_unsubscribe'):
+                    result = apply_list_unsubscribe_hint(result)
+                results[index] = result
+
+    for item, result in zip(items, results):
+        yield {
             "id": item['id'],
-            "content": item.get('content', ''),
-            "body": item.get('content', ''),  # Eski uyumluluk için
+            "content": item.get('content'),
             "snippet": item.get('snippet', ''),
-            "date": item['date'].strftime("%Y-%m-%d"),
+            "date": storage_date(item['date']),
             "predicted_class": result['predicted_class'],
             "confidence_score": result['confidence_score'],
             "all_scores": result['all_scores'],
+            "classified_by": result['classified_by'],
             "sender": item.get('sender', 'Bilinmeyen Gönderici'),
-            "subject": item.get('subject', '') or item.get('snippet', 'Konu yok')
+            "subject": item.get('subject', '') or item.get('snippet', 'Konu yok'),
+            "attachments": item.get('attachments', [])
         }
-        categorized_mails.append(mail_data)
-    
-    return categorized_mails
+
+
+def categorizer_mails(service=None, message_ids=None, progress=None):
+    """
+    Mailleri akış halinde çeker, CLASSIFY_CHUNK_SIZE'lık gruplar halinde sınıflandırır
+    ve her maili veritabanına yazılacak formatta geldikçe döndürür (generator).
+    message_ids verilirse sadece bu mesajlar, verilmezse son 7 günün mailleri işlenir.
+    progress verilirse (ImportProgress) çekilen ve sınıflandırılan mail sayıları işlenir.
+    """
+    classifier = get_classifier()
+
+    if message_ids is None:
+        mails = iter_daily_mails(service)
+    else:
+        mails = iter_mails(service, message_ids)
+
+    def classify(chunk):
+        if progress is not None:
+            progress.increment("fetched", len(chunk))
+        classified = list(classify_chunk(classifier, chunk))
+        if progress is not None:
+            progress.increment("classified", len(classified))
+        return classified
+
+    chunk = []
+    for item in mails:
+        chunk.append(item)
+        if len(chunk) >= CLASSIFY_CHUNK_SIZE:
+            yield from classify(chunk)
+            chunk = []
+    if chunk:
+        yield from classify(chunk)
 
 
 if __name__ == "__main__" :
-    categorizer_mails()
-    if categorized_mails:
-        print(categorized_mails[0])     
\ No newline at end of file
+    first_mail = next(categorizer_mails(), None)
+    if first_mail:
+        print(first_mail)
@@ -0,0 +1,159 @@
+import os
+import re
+import json
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Sadece boşluk farkı olan içerikler aynı anahtara düşsün diye boşlukları sadeleştirir."""
+    return re.sub(r'\s+', ' ', text or '').strip()
+
+
+def make_cache_key(text, labels, model_name=''):
+    """Model, etiket kümesi ve normalize edilmiş metinden sabit uzunlukta bir anahtar üretir."""
+    digest = hashlib.sha256()
+    digest.update(model_name.encode('utf-8'))
+    digest.update(b'\x1e')
+    digest.update('\x1f'.join(labels).encode('utf-8'))
+    digest.update(b'\x1e')
+    digest.update(normalize_text(text).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class SQLiteCacheStore:
+    """Sınıflandırma sonuçlarını yerel bir SQLite dosyasında saklar."""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS classification_cache (key TEXT PRIMARY KEY, result TEXT NOT NULL)"
+        )
+        self.connection.commit()
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT key, result FROM classification_cache WHERE key IN ({placeholders})", list(keys)
+            ).fetchall()
+        return {key: json.loads(result) for key, result in rows}
+
+    def set_many(self, items):
+        with self.lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO classification_cache (key, result) VALUES (?, ?)",
+                [(key, json.dumps(result)) for key, result in items.items()]
+            )
+            self.connection.commit()
+
+
+class MongoCacheStore:
+    """Sınıflandırma sonuçlarını bir MongoDB koleksiyonunda (_id = anahtar) saklar."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        documents = self.collection.find({"_id": {"$in": list(keys)}})
+        return {document["_id"]: document["result"] for document in documents}
+
+    def set_many(self, items):
+        from pymongo import UpdateOne
+        if not items:
+            return
+        self.collection.bulk_write([
+            UpdateOne({"_id": key}, {"$set": {"result": result}}, upsert=True)
+            for key, result in items.items()
+        ], ordered=False)
+
+
+class ClassificationCache:
+    """
+    İki katmanlı sınıflandırma önbelleği: bellek içi LRU ve isteğe bağlı kalıcı katman.
+    Kalıcı katmandan gelen sonuçlar LRU'ya da alınır.
+    """
+
+    def __init__(self, max_size=10000, store=None):
+        self.max_size = max_size
+        self.store = store
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def _remember(self, key, result):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def get_many(self, keys):
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self.lock:
+            for key in keys:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    found[key] = self.entries[key]
+            self.memory_hits += len(found)
+
+        remaining = [key for key in keys if key not in found]
+        if remaining and self.store is not None:
+            stored = self.store.get_many(remaining)
+            with self.lock:
+                for key, result in stored.items():
+                    self._remember(key, result)
+                self.store_hits += len(stored)
+            found.update(stored)
+
+        with self.lock:
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items):
+        with self.lock:
+            for key, result in items.items():
+                self._remember(key, result)
+        if self.store is not None and items:
+            self.store.set_many(items)
+
+    def stats(self):
+        with self.lock:
+            hits = self.memory_hits + self.store_hits
+            total = hits + self.misses
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "store_hits": self.store_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "persistent": self.store is not None
+            }
+
+
+def create_cache(mongo_collection=None):
+    """
+    Ortam değişkenlerine göre önbellek oluşturur.
+    CLASSIFICATION_CACHE_STORE: none | sqlite | mongo (varsayılan: none)
+    """
+    store_type = os.getenv("CLASSIFICATION_CACHE_STORE", "none").lower()
+    store = None
+    if store_type == "sqlite":
+        store = SQLiteCacheStore(os.getenv("CLASSIFICATION_CACHE_SQLITE_PATH", "classification_cache.sqlite3"))
+    elif store_type == "mongo" and mongo_collection is not None:
+        store = MongoCacheStore(mongo_collection)
+    return ClassificationCache(
+        max_size=int(os.getenv("CLASSIFICATION_CACHE_SIZE", "10000")),
+        store=store
+    )
@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from google.oauth2.credentials import Credentials
+from google.auth.transport.requests import Request
+from googleapiclient.discovery import build
+
+from take_mails import SCOPES
+
+logger = logging.getLogger(__name__)
+
+# Oluşturulan Gmail servis nesnelerinin bellekte tutulma süresi (saniye)
+SERVICE_TTL_SECONDS = int(os.getenv("GMAIL_SERVICE_TTL_SECONDS", "1800"))
+# Access token'ın süresi dolmadan bu kadar önce yenilenir (saniye)
+REFRESH_MARGIN_SECONDS = int(os.getenv("GMAIL_TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+
+
+class SessionNotFoundError(Exception):
+    """Kullanıcı için kayıtlı (veya yenilenebilir) Gmail kimlik bilgisi yok."""
+
+
+class GmailSessionManager:
+    """
+    Kullanıcı bazlı Gmail oturumları. Kimlik bilgileri user_sessions koleksiyonunda saklanır,
+    süresi dolmak üzere olan token'lar istek sırasında değil önceden yenilenir.
+    Gmail servis nesneleri thread-safe olmadığından thread-local önbellekte kullanıcı başına tutulur;
+    thread bittiğinde önbelleği de onunla birlikte atılır.
+    """
+
+    def __init__(self, collection, service_ttl=SERVICE_TTL_SECONDS, refresh_margin=REFRESH_MARGIN_SECONDS):
+        self.collection = collection
+        self.service_ttl = service_ttl
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self.credentials = {}
+        self.local = threading.local()
+        # Kimlik bilgisi değiştiğinde artar; diğer thread'lerdeki eski servisler bir sonraki kullanımda atılır
+        self.generations = {}
+        self.refresh_locks = {}
+        self.lock = threading.Lock()
+
+    def save_credentials(self, user_email, creds):
+        self.collection.update_one(
+            {"email": user_email},
+            {"$set": {
+                "email": user_email,
+                "credentials": json.loads(creds.to_json()),
+                "updated_at": datetime.now()
+            }},
+            upsert=True
+        )
+        with self.lock:
+            self.credentials[user_email] = creds
+            self._bump_generation(user_email)
+
+    def has_session(self, user_email):
+        with self.lock:
+            if user_email in self.credentials:
+                return True
+        return self.collection.count_documents(
+            {"email": user_email, "credentials": {"$exists": True}}, limit=1
+        ) > 0
+
+    def invalidate(self, user_email):
+        with self.lock:
+            self.credentials.pop(user_email, None)
+            self._bump_generation(user_email)
+
+    def get_credentials(self, user_email):
+        with self.lock:
+            creds = self.credentials.get(user_email)
+        if creds is None:
+            session = self.collection.find_one({"email": user_email}, {"credentials": 1, "_id": 0})
+            if not session or not session.get("credentials"):
+                raise SessionNotFoundError(f"{user_email} için Gmail oturumu bulunamadı")
+            creds = Credentials.from_authorized_user_info(session["credentials"], SCOPES)
+            with self.lock:
+                creds = self.credentials.setdefault(user_email, creds)
+        self._refresh_if_needed(user_email, creds)
+        return creds
+
+    def get_service(self, user_email):
+        """Kullanıcının Gmail servisini döndürür; aynı thread'de TTL dolana kadar yeniden kullanılır."""
+        creds = self.get_credentials(user_email)
+        services = self._thread_services()
+        now = time.monotonic()
+        with self.lock:
+            generation = self.generations.get(user_email, 0)
+        cached = services.get(user_email)
+        if cached and cached[1] > now and cached[2] == generation:
+            return cached[0]
+
+        service = build('gmail', 'v1', credentials=creds, cache_discovery=False)
+        services[user_email] = (service, now + self.service_ttl, generation)
+        self._evict_expired(services, now)
+        return service
+
+    def _thread_services(self):
+        # kullanıcı -> (servis, geçerlilik sonu, kimlik bilgisi nesli); sadece bu thread görür
+        services = getattr(self.local, "services", None)
+        if services is None:
+            services = self.local.services = {}
+        return services
+
+    def _needs_refresh(self, creds):
+        if creds.expiry is None:
+            return not creds.valid
+        # google-auth expiry değerini saat dilimi olmadan UTC olarak tutar
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return creds.expiry - now < self.refresh_margin
+
+    def _refresh_if_needed(self, user_email, creds):
+        if not self._needs_refresh(creds):
+            return
+        if not creds.refresh_token:
+            if not creds.valid:
+                raise SessionNotFoundError(f"{user_email} için token süresi dolmuş ve yenilenemiyor")
+            return
+
+        with self.lock:
+            refresh_lock = self.refresh_locks.setdefault(user_email, threading.Lock())
+        with refresh_lock:
+            # Başka bir thread bu arada yenilemiş olabilir
+            if not self._needs_refresh(creds):
+                return
+            try:
+                creds.refresh(Request())
+            except Exception as e:
+                logger.error(f"Token yenileme sırasında hata oluştu ({user_email}): {str(e)}")
+                self.invalidate(user_email)
+                raise SessionNotFoundError(f"{user_email} için token yenilenemedi") from e
+            self.collection.update_one(
+                {"email": user_email},
+                {"$set": {"credentials": json.loads(creds.to_json()), "updated_at": datetime.now()}}
+            )
+            logger.info(f"{user_email} için access token yenilendi")
+
+    def _bump_generation(self, user_email):
+        self.generations[user_email] = self.generations.get(user_email, 0) + 1
+
+    def _evict_expired(self, services, now):
+        for user_email in [user_email for user_email, cached in services.items() if cached[1] <= now]:
+            del services[user_email]
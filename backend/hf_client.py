@@ -0,0 +1,126 @@
+import os
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import RETRIES
+
+logger = logging.getLogger(__name__)
+
+HF_API_BASE_URL = os.getenv("HF_API_URL", "https://api-inference.huggingface.co/models")
+CONNECT_TIMEOUT_SECONDS = float(os.getenv("HF_CONNECT_TIMEOUT_SECONDS", "5"))
+READ_TIMEOUT_SECONDS = float(os.getenv("HF_TIMEOUT_SECONDS", "30"))
+MAX_RETRIES = int(os.getenv("HF_MAX_RETRIES", "5"))
+# Aynı anda HF'e gönderilen en fazla istek sayısı (tüm thread'ler toplamı)
+MAX_CONCURRENCY = int(os.getenv("HF_MAX_CONCURRENCY", "4"))
+MAX_BACKOFF_SECONDS = 60
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HFInferenceError(Exception):
+    """HF Inference API isteği tekrar denemelere rağmen başarısız oldu veya beklenmeyen yanıt döndü."""
+
+
+def _backoff(attempt):
+    """Exponential backoff + jitter ile bekleme süresi (saniye)."""
+    return min(2 ** attempt + random.random(), MAX_BACKOFF_SECONDS)
+
+
+def retry_delay(response, attempt):
+    """
+    Tekrar denemeden önce beklenecek süre: önce Retry-After başlığı, model yükleniyorsa
+    yanıttaki estimated_time, ikisi de yoksa exponential backoff.
+    """
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(float(retry_after), MAX_BACKOFF_SECONDS)
+        except ValueError:
+            pass
+    try:
+        estimated_time = response.json().get("estimated_time")
+    except (ValueError, AttributeError):
+        estimated_time = None
+    if estimated_time:
+        return min(float(estimated_time), MAX_BACKOFF_SECONDS)
+    return _backoff(attempt)
+
+
+class HFInferenceClient:
+    """
+    HF Inference API istemcisi. Tek bir requests.Session üzerinden keep-alive bağlantıları
+    yeniden kullanır (mail başına TLS el sıkışması olmaz), zaman aşımı ve tekrar deneme uygular,
+    eş zamanlı istek sayısını max_concurrency ile sınırlar.
+    """
+
+    def __init__(self, hf_token, model, api_base_url=HF_API_BASE_URL,
+                 timeout=(CONNECT_TIMEOUT_SECONDS, READ_TIMEOUT_SECONDS),
+                 max_retries=MAX_RETRIES, max_concurrency=MAX_CONCURRENCY):
+        self.api_url = f"{api_base_url.rstrip('/')}/{model}"
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_concurrency = max(max_concurrency, 1)
+        self.semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="hf-client")
+
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"Bearer {hf_token}"})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+    def post(self, payload):
+        """JSON isteği gönderir; geçici hatalarda bekleyip tekrar dener, başarılı yanıtın JSON'unu döndürür."""
+        for attempt in range(self.max_retries + 1):
+            with self.semaphore:
+                try:
+                    response = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = f"bağlantı hatası: {str(e)}"
+                    delay = _backoff(attempt)
+                else:
+                    if response.status_code == 200:
+                        return response.json()
+                    if response.status_code not in RETRYABLE_STATUSES:
+                        raise HFInferenceError(
+                            f"HF isteği başarısız ({response.status_code}): {response.text[:200]}"
+                        )
+                    error = f"HTTP {response.status_code}"
+                    delay = retry_delay(response, attempt)
+
+            if attempt == self.max_retries:
+                break
+            RETRIES.labels("hf").inc()
+            logger.warning(f"HF isteği başarısız ({error}), {delay:.1f} sn sonra tekrar denenecek")
+            time.sleep(delay)
+
+        raise HFInferenceError(f"HF isteği {self.max_retries} tekrar denemeden sonra başarısız: {error}")
+
+    def zero_shot(self, text, labels):
+        """Tek bir metni sınıflandırır ve {etiket: skor} döndürür."""
+        result = self.post({
+            "inputs": text,
+            "parameters": {
+                "candidate_labels": labels,
+                "multi_label": False
+            }
+        })
+        if not isinstance(result, dict) or "labels" not in result or "scores" not in result:
+            raise HFInferenceError(f"Beklenmeyen HF yanıtı: {str(result)[:200]}")
+        return dict(zip(result["labels"], result["scores"]))
+
+    def zero_shot_many(self, texts, labels):
+        """Metinleri en fazla max_concurrency eş zamanlı istekle sınıflandırır; sonuçlar giriş sırasıyla döner."""
+        if len(texts) <= 1 or self.max_concurrency == 1:
+            return [self.zero_shot(text, labels) for text in texts]
+        return list(self.executor.map(lambda text: self.zero_shot(text, labels), texts))
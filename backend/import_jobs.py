@@ -0,0 +1,231 @@
+import os
+import time
+import uuid
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Aynı anda çalışabilecek import işi (hesap) sayısı. Gmail kotası hesap bazında, sınıflandırıcı
+# CLASSIFIER_MAX_CONCURRENCY ile sınırlandığından büyük bir posta kutusu diğer hesapları bekletmez
+IMPORT_JOB_WORKERS = int(os.getenv("IMPORT_JOB_WORKERS", "8"))
+# İlerleme bilgisinin MongoDB'ye en sık yazılma aralığı (saniye)
+PROGRESS_FLUSH_SECONDS = float(os.getenv("IMPORT_PROGRESS_FLUSH_SECONDS", "1"))
+
+# Aktif işler sahibi süreç tarafından bu aralıkla yenilenen süreli bir kiraya sahiptir; kirası dolan
+# işin süreci ölmüş sayılır. Yeni başlayan bir süreç sadece kirası dolmuş işleri başarısız işaretler
+JOB_LEASE_SECONDS = float(os.getenv("IMPORT_JOB_LEASE_SECONDS", "60"))
+# Başka bir süreçteki işin bitmesi beklenirken durumun kontrol edilme aralığı (saniye)
+JOB_POLL_SECONDS = 1.0
+
+ACTIVE_STATUSES = ["queued", "running"]
+
+
+class ImportProgress:
+    """Import hattının aşama bazlı sayaçları. Her değişiklikte on_change çağrılır."""
+
+    STAGES = ("listed", "skipped", "fetched", "bodies", "classified", "stored", "removed")
+
+    def __init__(self, on_change=None):
+        self.counts = dict.fromkeys(self.STAGES, 0)
+        self.on_change = on_change
+        self.lock = threading.Lock()
+
+    def increment(self, stage, count=1):
+        if not count:
+            return
+        with self.lock:
+            self.counts[stage] += count
+            snapshot = dict(self.counts)
+        if self.on_change:
+            self.on_change(snapshot)
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counts)
+
+
+class ImportJobManager:
+    """
+    Import işlerini arka planda sınırlı sayıda worker ile çalıştırır.
+    İş durumu ve ilerlemesi MongoDB'de tutulduğu için yeniden başlatmadan sonra da sorgulanabilir.
+    """
+
+    def __init__(self, collection, max_workers=IMPORT_JOB_WORKERS, lease_seconds=JOB_LEASE_SECONDS):
+        self.collection = collection
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="import-job")
+        self.lock = threading.Lock()
+        # Bu süreçte kuyruğa alınan işlerin future'ları (job_id -> Future)
+        self.futures = {}
+        # Aynı süreçteki birden fazla yönetici de ayrı sahip sayılır
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds
+        self.stop_event = threading.Event()
+        self.collection.create_index("job_id", unique=True)
+        self.collection.create_index([("active", 1), ("lease_expires_at", 1)])
+        self._fail_expired_jobs()
+        # Kullanıcı başına en fazla bir aktif iş; aynı anda gelen isteklerden (diğer worker'lar dahil) sadece biri ekleyebilir
+        self.collection.create_index("user_email", unique=True, partialFilterExpression={"active": True})
+        threading.Thread(target=self._renew_leases, name="import-job-lease", daemon=True).start()
+
+    def _lease_expiry(self):
+        return datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+
+    def _renew_leases(self):
+        # Bu yöneticinin bekleyen ve çalışan işlerinin kirası süresi dolmadan uzatılır
+        while not self.stop_event.wait(self.lease_seconds / 3):
+            try:
+                self.collection.update_many(
+                    {"owner": self.owner, "active": True},
+                    {"$set": {"lease_expires_at": self._lease_expiry()}}
+                )
+                self._fail_expired_jobs()
+            except Exception as e:
+                logger.error(f"Import işi kiraları yenilenemedi: {str(e)}")
+
+    def _fail_expired_jobs(self, user_email=None):
+        # Sahibi olan süreç kirayı yenilemeyi bıraktıysa (çöktü / yeniden başlatıldı) iş bir daha çalışmayacak.
+        # Kira alanı olmayan işler bu alandan önceki sürümlerden kalmıştır
+        query = {"status": {"$in": ACTIVE_STATUSES}, "$or": [
+            {"lease_expires_at": {"$lt": datetime.utcnow()}},
+            {"lease_expires_at": {"$exists": False}}
+        ]}
+        if user_email is not None:
+            query["user_email"] = user_email
+        result = self.collection.update_many(query, {"$set": {
+            "status": "failed",
+            "error": "İşi çalıştıran sunucu yanıt vermediği için iş yarıda kaldı",
+            "finished_at": datetime.now()
+        }, "$unset": {"active": ""}})
+        if result.modified_count:
+            logger.warning(f"Kirası dolmuş {result.modified_count} import işi başarısız olarak işaretlendi")
+
+    def shutdown(self, wait=True):
+        self.stop_event.set()
+        self.executor.shutdown(wait=wait)
+
+    def find_active_job(self, user_email):
+        return self.collection.find_one(
+            {"user_email": user_email, "active": True}, {"_id": 0}
+        )
+
+    def submit(self, user_email, run_import, **kwargs):
+        """
+        Kullanıcı için yeni bir import işi kuyruğa alır ve iş kaydını döndürür.
+        Kullanıcının zaten bekleyen veya çalışan bir işi varsa o döndürülür.
+        """
+        return self._submit(user_email, run_import, kwargs)[0]
+
+    def run(self, user_email, run_import, **kwargs):
+        """
+        Import'u iş olarak çalıştırır, bitmesini bekler ve sonucunu döndürür (hata varsa fırlatır).
+        Kullanıcının bu veya başka bir süreçte aktif bir işi varsa önce onun bitmesi beklenir;
+        böylece aynı hesabın import'ları, push senkronizasyonları dahil, hiçbir zaman üst üste binmez.
+        """
+        while True:
+            job, future = self._submit(user_email, run_import, kwargs)
+            if future is not None:
+                return future.result()
+            self._wait_for_job(job)
+
+    def _wait_for_job(self, job):
+        with self.lock:
+            future = self.futures.get(job["job_id"])
+        if future is not None:
+            # Bu süreçteki iş; hatası onu başlatanı ilgilendirir
+            concurrent.futures.wait([future])
+            return
+        while self.collection.find_one({"job_id": job["job_id"], "active": True}, {"_id": 1}):
+            time.sleep(JOB_POLL_SECONDS)
+            self._fail_expired_jobs(job["user_email"])
+
+    def _submit(self, user_email, run_import, kwargs):
+        """(iş, future) döndürür; kullanıcının mevcut aktif işi döndürülüyorsa future None'dır."""
+        with self.lock:
+            self._fail_expired_jobs(user_email)
+            while True:
+                active_job = self.find_active_job(user_email)
+                if active_job:
+                    return active_job, None
+                job = self._new_job(user_email, kwargs)
+                try:
+                    self.collection.insert_one(dict(job))
+                    break
+                except DuplicateKeyError:
+                    # Başka bir süreç aynı kullanıcı için araya iş ekledi; o iş döndürülür
+                    continue
+            future = self.executor.submit(self._run, job["job_id"], run_import, user_email, kwargs)
+            self.futures[job["job_id"]] = future
+        future.add_done_callback(lambda _: self._forget(job["job_id"]))
+        return job, future
+
+    def _forget(self, job_id):
+        with self.lock:
+            self.futures.pop(job_id, None)
+
+    def _new_job(self, user_email, kwargs):
+        return {
+            "job_id": uuid.uuid4().hex,
+            "user_email": user_email,
+            "status": "queued",
+            "active": True,
+            "owner": self.owner,
+            "lease_expires_at": self._lease_expiry(),
+            "params": kwargs,
+            "progress": dict.fromkeys(ImportProgress.STAGES, 0),
+            "result": None,
+            "error": None,
+            "created_at": datetime.now(),
+            "started_at": None,
+            "finished_at": None
+        }
+
+    def _run(self, job_id, run_import, user_email, kwargs):
+        self.collection.update_one(
+            {"job_id": job_id}, {"$set": {"status": "running", "started_at": datetime.now()}}
+        )
+        last_flush = 0.0
+        flush_lock = threading.Lock()
+
+        def save_progress(counts):
+            # Hattın thread'leri aynı anda çağırır; yazma sürerken gelenler beklemeden atlanır ve
+            # eski bir anlık görüntünün yenisinin üzerine yazılmaması için kilit içinde güncel sayılar okunur
+            nonlocal last_flush
+            if not flush_lock.acquire(blocking=False):
+                return
+            try:
+                now = time.monotonic()
+                if now - last_flush < PROGRESS_FLUSH_SECONDS:
+                    return
+                last_flush = now
+                self.collection.update_one({"job_id": job_id}, {"$set": {"progress": progress.snapshot()}})
+            finally:
+                flush_lock.release()
+
+        progress = ImportProgress(on_change=save_progress)
+        try:
+            result = run_import(user_email, progress=progress, **kwargs)
+            self.collection.update_one({"job_id": job_id, "active": True}, {"$set": {
+                "status": "completed",
+                "progress": progress.snapshot(),
+                "result": result,
+                "finished_at": datetime.now()
+            }, "$unset": {"active": ""}})
+            logger.info(f"Import işi tamamlandı: {job_id}")
+            return result
+        except Exception as e:
+            logger.error(f"Import işi başarısız ({job_id}): {str(e)}")
+            self.collection.update_one({"job_id": job_id, "active": True}, {"$set": {
+                "status": "failed",
+                "progress": progress.snapshot(),
+                "error": str(e),
+                "finished_at": datetime.now()
+            }, "$unset": {"active": ""}})
+            # run() ile bekleyen çağırana iletilir
+            raise
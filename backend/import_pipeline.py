@@ -0,0 +1,252 @@
+import os
+import queue
+import contextlib
+import logging
+import threading
+from datetime import datetime
+
+from take_mails import fetch_messages, parse_mail, BATCH_SIZE
+from categorize_mails import classify_chunk, get_classifier, needs_body, CLASSIFY_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Aşama başına worker sayıları ve aşamalar arası kuyruk kapasitesi (mail adedi)
+FETCH_WORKERS = int(os.getenv("IMPORT_FETCH_WORKERS", "2"))
+CLASSIFY_WORKERS = int(os.getenv("IMPORT_CLASSIFY_WORKERS", "1"))
+STORE_WORKERS = int(os.getenv("IMPORT_STORE_WORKERS", "1"))
+QUEUE_SIZE = int(os.getenv("IMPORT_QUEUE_SIZE", "200"))
+WRITE_CHUNK_SIZE = int(os.getenv("MONGO_WRITE_CHUNK_SIZE", "500"))
+# full: her mail gövdesiyle birlikte çekilir
+# metadata: önce sadece başlıklar çekilir; kurala uyan maillerin gövdesi çekilmez, modele gidenlerinki ikinci turda alınır
+FETCH_MODE = os.getenv("IMPORT_FETCH_MODE", "full")
+# Yazma kuyruğu bu kadar süre boş kalırsa eldeki mailler beklemeden yazılır (saniye)
+STORE_IDLE_FLUSH_SECONDS = 1.0
+
+_DONE = object()
+_POLL_SECONDS = 0.1
+
+
+class ImportPipeline:
+    """
+    Gmail'den çekme, sınıflandırma ve MongoDB'ye yazma aşamalarını sınırlı kuyruklarla
+    birbirine bağlayıp eş zamanlı çalıştırır. Toplam süre aşamaların toplamına değil
+    en yavaş aşamaya yaklaşır; kuyruklar dolunca önceki aşama bekler, bellek sınırlı kalır.
+
+    service_factory: her fetch worker'ı için ayrı Gmail servisi üretir (servis nesneleri thread-safe değil).
+    write_batch: mail listesini yazıp (yeni, güncellenen) sayılarını döndürür.
+    quota: verilirse Gmail çağrılarından önce hesabın kotasını ayıran quota(method, adet) fonksiyonu.
+    classifier_slot: verilirse her sınıflandırma chunk'ı bu fonksiyonun döndürdüğü context içinde çalışır
+    (import'lar arası paylaşılan sınıflandırıcı eş zamanlılık sınırı için).
+    user_email: verilirse bu hesabın öğrenilmiş gönderici kategorileri kullanılır.
+    """
+
+    def __init__(self, service_factory, write_batch, progress=None, classifier=None,
+                 fetch_workers=FETCH_WORKERS, classify_workers=CLASSIFY_WORKERS,
+                 store_workers=STORE_WORKERS, queue_size=QUEUE_SIZE,
+                 fetch_batch_size=BATCH_SIZE, classify_chunk_size=CLASSIFY_CHUNK_SIZE,
+                 write_chunk_size=WRITE_CHUNK_SIZE, fetch_mode=FETCH_MODE, quota=None, classifier_slot=None,
+                 user_email=None):
+        self.service_factory = service_factory
+        self.write_batch = write_batch
+        self.progress = progress
+        self.classifier = classifier or get_classifier()
+        self.fetch_workers = fetch_workers
+        self.classify_workers = classify_workers
+        self.store_workers = store_workers
+        self.fetch_batch_size = fetch_batch_size
+        self.classify_chunk_size = classify_chunk_size
+        self.write_chunk_size = write_chunk_size
+        self.fetch_mode = fetch_mode
+        self.quota = quota
+        self.classifier_slot = classifier_slot or contextlib.nullcontext
+        self.user_email = user_email
+
+        self.id_queue = queue.Queue(maxsize=max(fetch_workers * 2, 1))
+        self.classify_queue = queue.Queue(maxsize=queue_size)
+        self.store_queue = queue.Queue(maxsize=queue_size)
+
+        self.stop_event = threading.Event()
+        self.error = None
+        self.lock = threading.Lock()
+        self.new_count = 0
+        self.updated_count = 0
+
+    def _increment(self, stage, count):
+        if self.progress is not None:
+            self.progress.increment(stage, count)
+
+    def _fail(self, exception):
+        with self.lock:
+            if self.error is None:
+                self.error = exception
+        self.stop_event.set()
+
+    def _put(self, target_queue, item):
+        while not self.stop_event.is_set():
+            try:
+                target_queue.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source_queue, timeout=None):
+        """Kuyruktan eleman alır; hata durumunda _DONE, timeout dolarsa None döner."""
+        waited = 0.0
+        while not self.stop_event.is_set():
+            try:
+                return source_queue.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                waited += _POLL_SECONDS
+                if timeout is not None and waited >= timeout:
+                    return None
+        return _DONE
+
+    def _start_stage(self, name, workers, work, next_queue, next_workers):
+        """Aşamanın worker'larını başlatır; son worker bitince sonraki aşamaya bitiş sinyali gönderir."""
+        remaining = [workers]
+
+        def run():
+            try:
+                work()
+            except Exception as e:
+                logger.error(f"Import hattı {name} aşamasında hata: {str(e)}")
+                self._fail(e)
+            finally:
+                with self.lock:
+                    remaining[0] -= 1
+                    is_last = remaining[0] == 0
+                if is_last and next_queue is not None:
+                    for _ in range(next_workers):
+                        self._put(next_queue, _DONE)
+
+        threads = [
+            threading.Thread(target=run, name=f"import-{name}-{index}", daemon=True)
+            for index in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _fetch_parsed(self, service, msg_ids, with_body):
+        today = datetime.now()
+        fetched = fetch_messages(service, msg_ids, format='full' if with_body else 'metadata',
+                                 batch_size=self.fetch_batch_size, quota=self.quota)
+        mails = []
+        for mail_data in fetched:
+            try:
+                mails.append(parse_mail(mail_data, default_date=today, with_body=with_body))
+            except Exception as e:
+                logger.error(f"Mail {mail_data.get('id')} işlenirken hata: {str(e)}")
+        return mails
+
+    def _fetch_worker(self):
+        service = self.service_factory()
+        metadata_first = self.fetch_mode == "metadata"
+        while True:
+            batch = self._get(self.id_queue)
+            if batch is _DONE:
+                return
+            mails = self._fetch_parsed(service, batch, with_body=not metadata_first)
+            self._increment("fetched", len(mails))
+
+            if metadata_first:
+                # Kurala uymayan, yani modele gidecek mailler için ikinci turda gövde çekilir
+                body_ids = [mail['id'] for mail in mails if needs_body(mail, self.user_email)]
+                if body_ids:
+                    with_body = {mail['id']: mail for mail in self._fetch_parsed(service, body_ids, with_body=True)}
+                    self._increment("bodies", len(with_body))
+                    mails = [with_body.get(mail['id'], mail) for mail in mails]
+
+            for mail in mails:
+                if not self._put(self.classify_queue, mail):
+                    return
+
+    def _classify_worker(self):
+        finished = False
+        while not finished:
+            item = self._get(self.classify_queue)
+            if item is _DONE:
+                return
+            chunk = [item]
+            # Kuyrukta hazır bekleyen maillerle chunk'ı doldur, yenisini beklemeden sınıflandır
+            while len(chunk) < self.classify_chunk_size:
+                try:
+                    item = self.classify_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    finished = True
+                    break
+                chunk.append(item)
+
+            with self.classifier_slot():
+                classified = list(classify_chunk(self.classifier, chunk, user_email=self.user_email))
+            self._increment("classified", len(classified))
+            for mail in classified:
+                if not self._put(self.store_queue, mail):
+                    return
+
+    def _store_worker(self):
+        pending = []
+
+        def flush():
+            if not pending:
+                return
+            new_count, updated_count = self.write_batch(list(pending))
+            with self.lock:
+                self.new_count += new_count
+                self.updated_count += updated_count
+            self._increment("stored", len(pending))
+            pending.clear()
+
+        while True:
+            item = self._get(self.store_queue, timeout=STORE_IDLE_FLUSH_SECONDS)
+            if item is _DONE:
+                if not self.stop_event.is_set():
+                    flush()
+                return
+            if item is None:
+                flush()
+                continue
+            pending.append(item)
+            if len(pending) >= self.write_chunk_size:
+                flush()
+
+    def run(self, message_ids):
+        """
+        Mesaj ID akışını hattan geçirir ve (yeni, güncellenen) mail sayılarını döndürür.
+        Herhangi bir aşamada hata olursa hat durdurulur ve hata yeniden fırlatılır.
+        """
+        threads = []
+        threads += self._start_stage("store", self.store_workers, self._store_worker, None, 0)
+        threads += self._start_stage("classify", self.classify_workers, self._classify_worker,
+                                     self.store_queue, self.store_workers)
+        threads += self._start_stage("fetch", self.fetch_workers, self._fetch_worker,
+                                     self.classify_queue, self.classify_workers)
+
+        # ID listeleme çağıran thread'de yapılır ve batch'ler halinde fetch aşamasına verilir
+        try:
+            batch = []
+            for msg_id in message_ids:
+                if self.stop_event.is_set():
+                    break
+                batch.append(msg_id)
+                if len(batch) >= self.fetch_batch_size:
+                    self._put(self.id_queue, batch)
+                    batch = []
+            if batch:
+                self._put(self.id_queue, batch)
+        except Exception as e:
+            logger.error(f"Import hattı listeleme aşamasında hata: {str(e)}")
+            self._fail(e)
+        finally:
+            for _ in range(self.fetch_workers):
+                self._put(self.id_queue, _DONE)
+
+        for thread in threads:
+            thread.join()
+
+        if self.error is not None:
+            raise self.error
+        return self.new_count, self.updated_count
@@ -0,0 +1,127 @@
+import os
+import time
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from metrics import timed
+
+# Gmail API kullanıcı başına saniyede 250 kota birimine izin verir; 0 ise kota takibi kapalı
+GMAIL_QUOTA_UNITS_PER_SECOND = float(os.getenv("GMAIL_QUOTA_UNITS_PER_SECOND", "250"))
+# Kısa süreli patlamalarda harcanabilecek en fazla birim (kova kapasitesi)
+GMAIL_QUOTA_BURST = float(os.getenv("GMAIL_QUOTA_BURST", "250"))
+# Tüm kullanıcıların import'ları için aynı anda çalışabilecek sınıflandırma sayısı
+CLASSIFIER_MAX_CONCURRENCY = int(os.getenv("CLASSIFIER_MAX_CONCURRENCY", "2"))
+
+# Gmail API metotlarının kota maliyetleri (birim / çağrı); batch içindeki her istek ayrı sayılır
+QUOTA_COSTS = {
+    "messages.get": 5,
+    "messages.list": 5,
+    "history.list": 2,
+    "getProfile": 1,
+}
+
+
+class TokenBucket:
+    """Saniyede `rate` birim dolan, en fazla `capacity` birim biriktiren kova."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, units):
+        """
+        Yeterli birim birikene kadar bekler. Kapasiteden büyük istekler kova dolunca geçer
+        ve kovayı eksiye düşürür; sonraki istekler borç kapanana kadar bekler.
+        """
+        while True:
+            with self.lock:
+                self._refill(time.monotonic())
+                needed = min(units, self.capacity)
+                if self.tokens >= needed:
+                    self.tokens -= units
+                    return
+                wait = (needed - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class QuotaTracker:
+    """Her Gmail hesabı için ayrı kota kovası tutar; bir hesabın yoğunluğu diğerlerini yavaşlatmaz."""
+
+    def __init__(self, rate=GMAIL_QUOTA_UNITS_PER_SECOND, capacity=GMAIL_QUOTA_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def _bucket(self, user_email):
+        with self.lock:
+            bucket = self.buckets.get(user_email)
+            if bucket is None:
+                bucket = self.buckets[user_email] = TokenBucket(self.rate, self.capacity)
+            return bucket
+
+    def acquire(self, user_email, method, count=1):
+        """`count` adet `method` çağrısının kota maliyeti kadar birim ayırır (gerekirse bekler)."""
+        if self.rate <= 0:
+            return
+        with timed("gmail_quota_wait"):
+            self._bucket(user_email).acquire(QUOTA_COSTS[method] * count)
+
+    def for_user(self, user_email):
+        """take_mails fonksiyonlarına verilecek quota(method, count) çağrılabilirini döndürür."""
+        def quota(method, count=1):
+            self.acquire(user_email, method, count)
+        return quota
+
+
+class FairGate:
+    """
+    Paylaşılan bir kaynak için global eş zamanlılık sınırı. Bekleyenler geliş sırasına göre değil
+    kullanıcı bazında sırayla (round-robin) içeri alınır; büyük bir posta kutusunun yüzlerce
+    chunk'ı diğer kullanıcıların önüne geçemez.
+    """
+
+    def __init__(self, limit=CLASSIFIER_MAX_CONCURRENCY):
+        self.limit = max(limit, 1)
+        self.active = 0
+        self.condition = threading.Condition()
+        # kullanıcı -> bekleyen biletler; sıradaki kullanıcı her zaman ilk anahtardır
+        self.waiting = OrderedDict()
+
+    def _next_ticket(self):
+        user_email, tickets = next(iter(self.waiting.items()))
+        return user_email, tickets[0]
+
+    @contextmanager
+    def slot(self, user_email):
+        ticket = object()
+        with timed("classifier_wait"):
+            with self.condition:
+                self.waiting.setdefault(user_email, deque()).append(ticket)
+                while self.active >= self.limit or self._next_ticket()[1] is not ticket:
+                    self.condition.wait()
+                tickets = self.waiting.pop(user_email)
+                tickets.popleft()
+                if tickets:
+                    # Kullanıcının başka bileti varsa sıranın sonuna geçer
+                    self.waiting[user_email] = tickets
+                self.active += 1
+                self.condition.notify_all()
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.active -= 1
+                self.condition.notify_all()
+
+
+gmail_quota = QuotaTracker()
+classifier_gate = FairGate()
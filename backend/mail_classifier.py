@@ -1,39 +1,259 @@
-import requests
 import os
+import threading
 from dotenv import load_dotenv
+from classification_cache import make_cache_key
+from hf_client import HFInferenceClient
+from metrics import timed, CACHE_LOOKUPS
+
+
+DEFAULT_MODEL = "facebook/bart-large-mnli"
+# Etiketler Türkçe olduğundan çok dilli, küçük bir cümle gömme modeli
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+# HF zero-shot pipeline'ının varsayılan hipotez şablonu; API ile aynı skorları vermesi için
+HYPOTHESIS_TEMPLATE = "This example is {}."
+
+LABELS = [
+    "Pazarlama ve Reklam (Tanıtımlar)",
+    "Sosyal",
+    "İş ve Profesyonel İletişim",
+    "Abonelik Bildirimleri",
+    "Fatura ve Finansal Bildirimler",
+    "Şüpheli veya Güvenlik İçerikli",
+    "Diğer"
+]
+SUBSCRIPTION_LABEL = "Abonelik Bildirimleri"
+# Gömme modunda etiket vektörü için kullanılan Türkçe açıklamalar. Mailler Türkçe olduğundan
+# İngilizce hipotez şablonu yerine etiket ve tipik içeriği gömülür; açıklaması olmayan etiket tek başına gömülür
+LABEL_DESCRIPTIONS = {
+    "Pazarlama ve Reklam (Tanıtımlar)": "kampanya, indirim, fırsat, yeni ürün tanıtımı ve reklam içeren mailler",
+    "Sosyal": "sosyal medya bildirimleri, arkadaşlık istekleri, beğeniler, yorumlar ve mesajlar",
+    "İş ve Profesyonel İletişim": "toplantı, proje, iş teklifi, iş görüşmesi ve meslektaşlarla yazışmalar",
+    "Abonelik Bildirimleri": "bülten, haftalık özet, abone olunan sitelerden gelen düzenli bildirimler",
+    "Fatura ve Finansal Bildirimler": "fatura, ödeme, banka hesap hareketi, kredi kartı ekstresi ve makbuzlar",
+    "Şüpheli veya Güvenlik İçerikli": "şifre sıfırlama, giriş uyarısı, doğrulama kodu, dolandırıcılık ve oltalama girişimleri",
+    "Diğer": "diğer konulardaki genel mailler",
+}
+
+
+def label_anchor_text(label):
+    description = LABEL_DESCRIPTIONS.get(label)
+    return f"{label}: {description}" if description else label
+
+
+class HFInferenceBackend:
+    """
+    Hugging Face Inference API üzerinden zero-shot sınıflandırma (mail başına bir istek).
+    İstekler bağlantı havuzlu, tekrar denemeli HFInferenceClient ile eş zamanlı gönderilir.
+    """
+
+    def __init__(self, hf_token, model=DEFAULT_MODEL, client=None):
+        self.model_name = model
+        self.client = client or HFInferenceClient(hf_token, model)
+
+    def classify_batch(self, mail_contents, labels):
+        return self.client.zero_shot_many(list(mail_contents), labels)
+
+
+class LocalZeroShotBackend:
+    """
+    NLI zero-shot modelini süreç içinde CPU'da çalıştırır.
+    Birden fazla mailin tüm (mail, etiket) çiftleri max_batch_size'lık
+    parçalar halinde tek forward pass'lerde işlenir.
+    """
+
+    def __init__(self, model=DEFAULT_MODEL, max_batch_size=64, max_tokens=512, num_threads=None):
+        try:
+            import torch
+            from transformers import AutoTokenizer, AutoModelForSequenceClassification
+        except ImportError as e:
+            raise ImportError("Yerel sınıflandırma için 'torch' ve 'transformers' paketleri kurulu olmalı") from e
+
+        self.torch = torch
+        if num_threads:
+            torch.set_num_threads(num_threads)
+
+        self.model_name = model
+        self.tokenizer = AutoTokenizer.from_pretrained(model)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model)
+        self.model.eval()
+        self.max_batch_size = max_batch_size
+        self.max_tokens = max_tokens
+
+        label2id = {name.lower(): idx for name, idx in self.model.config.label2id.items()}
+        self.entailment_id = next(
+            (idx for name, idx in label2id.items() if name.startswith("entail")), -1
+        )
+
+    def classify_batch(self, mail_contents, labels):
+        if not mail_contents:
+            return []
+        hypotheses = [HYPOTHESIS_TEMPLATE.format(label) for label in labels]
+        pairs = [(content, hypothesis) for content in mail_contents for hypothesis in hypotheses]
+
+        entailment_logits = []
+        with self.torch.inference_mode():
+            for start in range(0, len(pairs), self.max_batch_size):
+                chunk = pairs[start:start + self.max_batch_size]
+                inputs = self.tokenizer(
+                    [premise for premise, _ in chunk],
+                    [hypothesis for _, hypothesis in chunk],
+                    truncation='only_first',
+                    max_length=self.max_tokens,
+                    padding=True,
+                    return_tensors='pt'
+                )
+                logits = self.model(**inputs).logits
+                entailment_logits.append(logits[:, self.entailment_id])
+
+        # Tek etiketli mod: her mail için entailment logit'leri etiketler arasında softmax'lanır
+        scores = self.torch.cat(entailment_logits).view(len(mail_contents), len(labels)).softmax(dim=-1)
+        return [dict(zip(labels, row)) for row in scores.tolist()]
+
+
+class EmbeddingBackend:
+    """
+    Hızlı mod: her mail bir kez küçük bir cümle gömme modelinden geçirilir ve başlangıçta
+    hesaplanan etiket vektörleriyle kosinüs benzerliği üzerinden skorlanır. Zero-shot'taki
+    (mail, etiket) başına forward pass yerine mail başına tek, çok daha küçük bir forward pass yapılır.
+    Benzerlikler temperature ile softmax'lanır ki skorlar diğer backend'lerdeki gibi toplamı 1 olan dağılım olsun.
+    """
+
+    def __init__(self, model=DEFAULT_EMBEDDING_MODEL, labels=LABELS, max_batch_size=64, max_tokens=256,
+                 temperature=0.05, num_threads=None):
+        try:
+            import numpy as np
+            import torch
+            from transformers import AutoTokenizer, AutoModel
+        except ImportError as e:
+            raise ImportError("Gömme tabanlı sınıflandırma için 'numpy', 'torch' ve 'transformers' paketleri kurulu olmalı") from e
+
+        self.np = np
+        self.torch = torch
+        if num_threads:
+            torch.set_num_threads(num_threads)
+
+        self.model_name = model
+        # Skorlar etiket metinlerine de bağlı; metinler değişince eski önbellek kayıtları kullanılmaz
+        self.cache_name = f"{model}#label-anchors-tr"
+        self.tokenizer = AutoTokenizer.from_pretrained(model)
+        self.model = AutoModel.from_pretrained(model)
+        self.model.eval()
+        self.max_batch_size = max_batch_size
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+
+        # Etiket vektörleri bir kez hesaplanır; farklı bir etiket listesi gelirse o da önbelleğe alınır
+        self.label_vectors = {}
+        self.label_lock = threading.Lock()
+        self._label_matrix(labels)
+
+    def embed(self, texts):
+        """Metinleri ortalama havuzlama (mean pooling) ile gömer; L2 normalize edilmiş (n, boyut) dizisi döner."""
+        vectors = []
+        with self.torch.inference_mode():
+            for start in range(0, len(texts), self.max_batch_size):
+                inputs = self.tokenizer(
+                    texts[start:start + self.max_batch_size],
+                    truncation=True,
+                    max_length=self.max_tokens,
+                    padding=True,
+                    return_tensors='pt'
+                )
+                hidden = self.model(**inputs).last_hidden_state
+                mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                vectors.append(pooled.float().numpy())
+        matrix = self.np.concatenate(vectors)
+        norms = self.np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / self.np.maximum(norms, 1e-12)
+
+    def _label_matrix(self, labels):
+        key = tuple(labels)
+        # Import hattının sınıflandırma thread'leri aynı anda çağırabilir; her liste bir kez gömülür
+        with self.label_lock:
+            if key not in self.label_vectors:
+                self.label_vectors[key] = self.embed([label_anchor_text(label) for label in labels])
+            return self.label_vectors[key]
+
+    def classify_batch(self, mail_contents, labels):
+        if not mail_contents:
+            return []
+        similarities = self.embed(list(mail_contents)) @ self._label_matrix(labels).T
+        logits = similarities / self.temperature
+        logits -= logits.max(axis=1, keepdims=True)
+        scores = self.np.exp(logits)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return [dict(zip(labels, row)) for row in scores.tolist()]
+
+
+def create_backend(hf_token):
+    """CLASSIFIER_BACKEND ortam değişkenine göre sınıflandırma backend'ini oluşturur (hf | local | embedding)."""
+    backend_name = os.getenv("CLASSIFIER_BACKEND", "hf").lower()
+    if backend_name == "embedding":
+        num_threads = os.getenv("CLASSIFIER_NUM_THREADS")
+        return EmbeddingBackend(
+            model=os.getenv("CLASSIFIER_EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL),
+            max_batch_size=int(os.getenv("CLASSIFIER_MAX_BATCH_SIZE", "64")),
+            max_tokens=int(os.getenv("CLASSIFIER_EMBEDDING_MAX_TOKENS", "256")),
+            temperature=float(os.getenv("CLASSIFIER_EMBEDDING_TEMPERATURE", "0.05")),
+            num_threads=int(num_threads) if num_threads else None
+        )
+    model = os.getenv("CLASSIFIER_MODEL", DEFAULT_MODEL)
+    if backend_name == "local":
+        num_threads = os.getenv("CLASSIFIER_NUM_THREADS")
+        return LocalZeroShotBackend(
+            model=model,
+            max_batch_size=int(os.getenv("CLASSIFIER_MAX_BATCH_SIZE", "64")),
+            max_tokens=int(os.getenv("CLASSIFIER_MAX_TOKENS", "512")),
+            num_threads=int(num_threads) if num_threads else None
+        )
+    return HFInferenceBackend(hf_token, model=model)
 
 
 class MailClassifier:
-    def __init__(self, hf_token):
-        self.api_url = "https://api-inference.huggingface.co/models/facebook/bart-large-mnli"
-        self.headers = {"Authorization": f"Bearer {hf_token}"}
-        self.labels = [
-            "Pazarlama ve Reklam (Tanıtımlar)",
-            "Sosyal",
-            "İş ve Profesyonel İletişim",
-            "Abonelik Bildirimleri",
-            "Fatura ve Finansal Bildirimler",
-            "Şüpheli veya Güvenlik İçerikli",
-            "Diğer"
-        ]
-        
-    
+    def __init__(self, hf_token, backend=None, cache=None):
+        self.backend = backend or create_backend(hf_token)
+        self.cache = cache
+        self.labels = list(LABELS)
+
+
     def classify_mail(self, mail_content):
-        payload = {
-            "inputs": mail_content,
-            "parameters": {
-                "candidate_labels": self.labels,
-                "multi_label": False
-            }
-        }
-        response = requests.post(self.api_url, headers=self.headers, json=payload)
-        result = response.json()
-        predicted_class = result['labels'][0]
-        confidence_score = result['scores'][0]
-        
-        return {
-            'predicted_class': predicted_class,
-            'confidence_score': confidence_score,
-            'all_scores': dict(zip(result['labels'], result['scores']))
-        }
+        return self.classify_mails([mail_content])[0]
+
+    def classify_mails(self, mail_contents):
+        """
+        Birden fazla maili backend'in desteklediği en büyük batch'lerle sınıflandırır.
+        Önbellekte bulunan ve aynı batch içinde tekrar eden içerikler için inference yapılmaz.
+        """
+        mail_contents = list(mail_contents)
+        model_name = getattr(self.backend, 'cache_name', None) or getattr(self.backend, 'model_name', '')
+        keys = [make_cache_key(content, self.labels, model_name) for content in mail_contents]
+
+        results = self.cache.get_many(keys) if self.cache is not None else {}
+
+        to_classify = {}
+        for key, content in zip(keys, mail_contents):
+            if key not in results and key not in to_classify:
+                to_classify[key] = content
+        if self.cache is not None:
+            CACHE_LOOKUPS.labels("hit").inc(len(mail_contents) - len(to_classify))
+            CACHE_LOOKUPS.labels("miss").inc(len(to_classify))
+
+        if to_classify:
+            new_results = {}
+            with timed("inference", items=len(to_classify)):
+                batch_scores = self.backend.classify_batch(list(to_classify.values()), self.labels)
+            for key, scores in zip(to_classify, batch_scores):
+                ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+                predicted_class, confidence_score = ranked[0]
+                new_results[key] = {
+                    'predicted_class': predicted_class,
+                    'confidence_score': confidence_score,
+                    'all_scores': dict(ranked)
+                }
+            if self.cache is not None:
+                self.cache.set_many(new_results)
+            results.update(new_results)
+
+        return [results[key] for key in keys]
 
@@ -0,0 +1,212 @@
+import os
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# MAIL_STATS_COUNTERS=1 iken kategori sayıları import ve silme sırasında artımlı güncellenen
+# sayaç koleksiyonundan okunur; kapalıyken her istekte aggregation ile hesaplanır
+COUNTERS_ENABLED = os.getenv("MAIL_STATS_COUNTERS", "0") == "1"
+# Mail yazma / silme ile sayaç $inc'i atomik olmadığından sayaçlar bu aralıkla (okunurken) aggregation'dan
+# yeniden kurulur; 0 ise sadece ilk okumada ve rebuild=true ile kurulur (saniye)
+RECONCILE_SECONDS = float(os.getenv("MAIL_STATS_RECONCILE_SECONDS", "3600"))
+# Rebuild sırasında araya $inc girerse aggregation en fazla bu kadar kez tekrarlanır
+REBUILD_ATTEMPTS = 3
+# Günlük mail hacmi için varsayılan pencere (gün)
+DEFAULT_STATS_DAYS = int(os.getenv("MAIL_STATS_DAYS", "30"))
+
+# Güven skoru histogramının kova sınırları; kural sonuçları 1.0 olduğundan son sınır 1'in biraz üstünde
+CONFIDENCE_BOUNDARIES = [0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0001]
+
+# Kullanıcının sayaçlarının aggregation'dan en az bir kez kurulduğunu gösteren kayıt
+_INITIALIZED_MARKER = "__initialized__"
+
+
+def stats_pipeline(match, days=DEFAULT_STATS_DAYS):
+    """
+    Kategori sayıları, güven skoru histogramı ve günlük hacmi tek aggregation'da ($facet) hesaplar.
+    $match kullanıcı (ve kategori) indeksinden yararlanır; sadece sayılan alanlar projekte edilir.
+    """
+    # Mail tarihleri naive UTC BSON date olarak saklanır; pencere günün başından itibaren sayılır
+    since = (datetime.utcnow() - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return [
+        {"$match": match},
+        {"$project": {"_id": 0, "predicted_class": 1, "confidence_score": 1, "date": 1}},
+        {"$facet": {
+            "categories": [
+                {"$group": {
+                    "_id": "$predicted_class",
+                    "count": {"$sum": 1},
+                    "avg_confidence": {"$avg": "$confidence_score"}
+                }},
+                {"$sort": {"count": -1}}
+            ],
+            "confidence": [
+                {"$bucket": {
+                    "groupBy": "$confidence_score",
+                    "boundaries": CONFIDENCE_BOUNDARIES,
+                    "default": "unknown",
+                    "output": {"count": {"$sum": 1}}
+                }}
+            ],
+            "daily": [
+                {"$match": {"date": {"$gte": since}}},
+                {"$group": {"_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$date"}}, "count": {"$sum": 1}}},
+                {"$sort": {"_id": 1}}
+            ],
+            "total": [
+                {"$count": "count"}
+            ]
+        }}
+    ]
+
+
+def format_stats(facets):
+    """Aggregation çıktısını API yanıtına çevirir."""
+    total = facets["total"][0]["count"] if facets["total"] else 0
+    confidence = []
+    for bucket in facets["confidence"]:
+        if bucket["_id"] == "unknown":
+            confidence.append({"range": None, "count": bucket["count"]})
+            continue
+        upper = next(boundary for boundary in CONFIDENCE_BOUNDARIES if boundary > bucket["_id"])
+        confidence.append({"range": [bucket["_id"], min(upper, 1.0)], "count": bucket["count"]})
+    return {
+        "total": total,
+        "categories": [
+            {
+                "category": item["_id"],
+                "count": item["count"],
+                "avg_confidence": round(item["avg_confidence"], 4) if item["avg_confidence"] is not None else None
+            }
+            for item in facets["categories"]
+        ],
+        "confidence_histogram": confidence,
+        "daily": [{"date": item["_id"], "count": item["count"]} for item in facets["daily"]]
+    }
+
+
+def count_pipeline(match):
+    return [
+        {"$match": match},
+        {"$group": {"_id": "$predicted_class", "count": {"$sum": 1}}}
+    ]
+
+
+def category_changes(categories, sign=1):
+    """Kategori listesinden {kategori: +/-adet} sözlüğü üretir."""
+    return {category: sign * count for category, count in Counter(categories).items()}
+
+
+def ids_by_category(mails):
+    """
+    {id, predicted_class} kayıtlarını {kategori: [id, ...]} olarak gruplar. Silme kategori bazında
+    yapılınca her kategorinin sayacı gerçekten silinen adet kadar düşürülebilir.
+    """
+    groups = defaultdict(list)
+    for mail in mails:
+        groups[mail.get("predicted_class")].append(mail["id"])
+    return groups
+
+
+class StatsCounters:
+    """
+    Kullanıcı başına kategori sayaçları: {user_email, category, count, version}. Import'ta yeni eklenen,
+    silmede kaldırılan mailler kadar $inc ile güncellenir; her $inc version'ı da artırır. Sayaçlar bir
+    kullanıcı için ilk okunduğunda, RECONCILE_SECONDS dolduğunda veya rebuild ile aggregation'dan kurulur;
+    böylece özellik açılmadan önce kaydedilmiş mailler de sayılır ve olası kaymalar düzelir.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.collection.create_index([("user_email", 1), ("category", 1)], unique=True)
+
+    def operations(self, user_email, changes):
+        """Async endpoint'lerin kendi sürücüsüyle yazabilmesi için UpdateOne listesi."""
+        return [
+            UpdateOne(
+                {"user_email": user_email, "category": category},
+                {"$inc": {"count": change, "version": 1}},
+                upsert=True
+            )
+            for category, change in changes.items() if change and category
+        ]
+
+    def apply(self, user_email, changes):
+        """Senkron (import hattı) güncelleme."""
+        operations = self.operations(user_email, changes)
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+
+    def _replace(self, user_email, category, count, versions):
+        """
+        Sayacı, aggregation'dan önce okunan version hâlâ geçerliyse değiştirir. Araya bir $inc
+        girdiyse (version değiştiyse veya kayıt yeni oluştuysa) False döner.
+        """
+        document = {"user_email": user_email, "category": category, "count": count}
+        if category not in versions:
+            try:
+                self.collection.insert_one({**document, "version": 1})
+            except DuplicateKeyError:
+                return False
+            return True
+        version = versions[category]
+        result = self.collection.replace_one(
+            {"user_email": user_email, "category": category, "version": version},
+            {**document, "version": (version or 0) + 1}
+        )
+        return result.matched_count == 1
+
+    def rebuild(self, user_email, count_mails):
+        """
+        Sayaçları count_mails() ile hesaplanan mutlak değerlerle değiştirir ve bu değerleri döndürür.
+        Sayaç version'ları aggregation'dan önce okunur ve yazarken kontrol edilir; arada bir import
+        veya silme $inc yaptıysa onun güncellemesi ezilmez, aggregation tekrarlanır.
+        """
+        for _ in range(REBUILD_ATTEMPTS):
+            versions = {
+                document["category"]: document.get("version")
+                for document in self.collection.find({"user_email": user_email}, {"category": 1, "version": 1, "_id": 0})
+                if document["category"] != _INITIALIZED_MARKER
+            }
+            counts = count_mails()
+            targets = {**dict.fromkeys(versions, 0), **{category: count for category, count in counts.items() if category}}
+            conflicts = [
+                category for category, count in targets.items()
+                if not self._replace(user_email, category, count, versions)
+            ]
+            if not conflicts:
+                self.collection.replace_one(
+                    {"user_email": user_email, "category": _INITIALIZED_MARKER},
+                    {"user_email": user_email, "category": _INITIALIZED_MARKER, "count": 0, "rebuilt_at": datetime.utcnow()},
+                    upsert=True
+                )
+                logger.info(f"{user_email} için kategori sayaçları yeniden kuruldu ({len(counts)} kategori)")
+                return counts
+            logger.info(f"{user_email} sayaçları yeniden kurulurken güncellendi, tekrar deneniyor: {conflicts}")
+        # Sürekli yazma alan kullanıcı: sayaçlar tutarsız kalabilir, işaret yenilenmediği için sonraki okuma tekrar dener
+        logger.warning(f"{user_email} için kategori sayaçları {REBUILD_ATTEMPTS} denemede yeniden kurulamadı")
+        return counts
+
+
+def counters_to_counts(documents, reconcile_seconds=RECONCILE_SECONDS):
+    """
+    Sayaç kayıtlarını {kategori: adet} sözlüğüne çevirir; sayaçlar henüz kurulmamışsa veya
+    son kurulumdan bu yana reconcile_seconds geçtiyse None döner (aggregation'dan yeniden kurulmalı).
+    """
+    marker = next((document for document in documents if document["category"] == _INITIALIZED_MARKER), None)
+    if marker is None:
+        return None
+    if reconcile_seconds > 0:
+        rebuilt_at = marker.get("rebuilt_at")
+        if rebuilt_at is None or datetime.utcnow() - rebuilt_at > timedelta(seconds=reconcile_seconds):
+            return None
+    return {
+        document["category"]: document["count"]
+        for document in documents
+        if document["category"] != _INITIALIZED_MARKER and document["count"] > 0
+    }
@@ -0,0 +1,162 @@
+import os
+import zlib
+import logging
+from datetime import datetime, timezone
+from bson.binary import Binary
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Bu boyutun (byte) üzerindeki gövdeler zlib ile sıkıştırılarak saklanır
+COMPRESS_MIN_BYTES = int(os.getenv("MAIL_BODY_COMPRESS_MIN_BYTES", "2048"))
+COMPRESSION_LEVEL = 6
+
+CONTENT_FIELD = "content"
+COMPRESSED_CONTENT_FIELD = "content_z"
+# Eski kayıtlarda content ile aynı HTML'i tutan alan
+LEGACY_BODY_FIELD = "body"
+
+
+def storage_date(value):
+    """
+    Mail tarihini MongoDB'de saklanacak saat dilimsiz UTC datetime'a çevirir (BSON date).
+    Eski kayıtlardaki "YYYY-MM-DD" metinleri de kabul edilir.
+    """
+    if isinstance(value, str):
+        value = datetime.strptime(value[:10], "%Y-%m-%d")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def compress_body(content):
+    return Binary(zlib.compress(content.encode("utf-8"), COMPRESSION_LEVEL))
+
+
+def decompress_body(data):
+    return zlib.decompress(bytes(data)).decode("utf-8")
+
+
+def to_storage_document(mail):
+    """
+    Maili veritabanı formatına çevirir: gövde tek alanda tutulur, büyük gövdeler sıkıştırılır.
+    ($set, $unset) çifti döndürür; $unset diğer gövde biçimini ve eski body alanını temizler.
+    content None ise (gövdesi henüz çekilmemiş mail) kayıtlı gövdeye dokunulmaz.
+    """
+    document = {key: value for key, value in mail.items() if key != LEGACY_BODY_FIELD}
+    if CONTENT_FIELD in document and document[CONTENT_FIELD] is None:
+        del document[CONTENT_FIELD]
+        return document, {}
+    content = document.pop(CONTENT_FIELD, None) or ""
+    unset = {LEGACY_BODY_FIELD: ""}
+
+    if len(content.encode("utf-8")) >= COMPRESS_MIN_BYTES:
+        document[COMPRESSED_CONTENT_FIELD] = compress_body(content)
+        unset[CONTENT_FIELD] = ""
+    else:
+        document[CONTENT_FIELD] = content
+        unset[COMPRESSED_CONTENT_FIELD] = ""
+    return document, unset
+
+
+def has_body(document):
+    return any(field in document for field in (CONTENT_FIELD, COMPRESSED_CONTENT_FIELD, LEGACY_BODY_FIELD))
+
+
+def from_storage_document(document):
+    """Veritabanından okunan mailin gövdesini şeffaf şekilde açar ve content alanına koyar."""
+    if not document:
+        return document
+    document = dict(document)
+    if COMPRESSED_CONTENT_FIELD in document:
+        document[CONTENT_FIELD] = decompress_body(document.pop(COMPRESSED_CONTENT_FIELD))
+    legacy_body = document.pop(LEGACY_BODY_FIELD, None)
+    if CONTENT_FIELD not in document and legacy_body is not None:
+        document[CONTENT_FIELD] = legacy_body
+    return document
+
+
+def upsert_operation(mail):
+    document, unset = to_storage_document(mail)
+    update = {"$set": document}
+    if unset:
+        update["$unset"] = unset
+    # Mail ID'leri hesap içinde tekildir; kayıt (user_email, id) ile eşleştirilir
+    return UpdateOne({"user_email": mail.get("user_email"), "id": mail["id"]}, update, upsert=True)
+
+
+def migrate_mail_bodies(collection, batch_size=500):
+    """
+    Eski formattaki mailleri (body + content çift kopya, sıkıştırılmamış büyük gövde)
+    yeni formata taşır. Taşınan mail sayısını döndürür; tekrar çalıştırılması güvenlidir.
+    """
+    query = {"$or": [
+        {LEGACY_BODY_FIELD: {"$exists": True}},
+        {CONTENT_FIELD: {"$type": "string"}}
+    ]}
+    migrated = 0
+    operations = []
+    for document in collection.find(query, {"_id": 1, CONTENT_FIELD: 1, LEGACY_BODY_FIELD: 1}):
+        content = document.get(CONTENT_FIELD) or document.get(LEGACY_BODY_FIELD) or ""
+        if LEGACY_BODY_FIELD not in document and len(content.encode("utf-8")) < COMPRESS_MIN_BYTES:
+            continue
+        new_fields, unset = to_storage_document({CONTENT_FIELD: content})
+        operations.append(UpdateOne({"_id": document["_id"]}, {"$set": new_fields, "$unset": unset}))
+        if len(operations) >= batch_size:
+            migrated += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        migrated += collection.bulk_write(operations, ordered=False).modified_count
+    logger.info(f"{migrated} mail yeni gövde formatına taşındı")
+    return migrated
+
+
+def migrate_mail_dates(collection, batch_size=500):
+    """
+    Tarihi "YYYY-MM-DD" metni olarak saklanmış eski mailleri BSON date'e çevirir; sıralama,
+    imleçli sayfalama ve günlük istatistikler tarih tipine göre çalışır. Taşınan mail sayısını döndürür.
+    """
+    migrated = 0
+    operations = []
+    for document in collection.find({"date": {"$type": "string"}}, {"_id": 1, "date": 1}):
+        try:
+            date = storage_date(document["date"])
+        except ValueError:
+            logger.warning(f"Tarih çevrilemedi ({document['_id']}): {document['date']!r}")
+            continue
+        operations.append(UpdateOne({"_id": document["_id"]}, {"$set": {"date": date}}))
+        if len(operations) >= batch_size:
+            migrated += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        migrated += collection.bulk_write(operations, ordered=False).modified_count
+    logger.info(f"{migrated} mailin tarihi BSON date formatına taşındı")
+    return migrated
+
+
+def assign_legacy_owner(db, owner_email):
+    """
+    Kullanıcı alanı eklenmeden önce kaydedilmiş (user_email'i olmayan) mailleri ve silinme
+    kayıtlarını tek bir hesaba atar. Bu kayıtlar atanana kadar hiçbir kullanıcıya gösterilmez.
+    """
+    legacy = {"user_email": None}
+    counts = {}
+    for collection_name in ("mails", "deleted_mails"):
+        counts[collection_name] = db[collection_name].update_many(legacy, {"$set": {"user_email": owner_email}}).modified_count
+    logger.info(f"Sahipsiz kayıtlar {owner_email} hesabına atandı: {counts}")
+    return counts
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import connect_to_mongodb
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Eski mail kayıtlarını güncel formata taşır")
+    parser.add_argument("--legacy-owner", help="user_email alanı olmayan eski kayıtların atanacağı hesap")
+    args = parser.parse_args()
+
+    db = connect_to_mongodb()
+    if args.legacy_owner:
+        assign_legacy_owner(db, args.legacy_owner.lower())
+    migrate_mail_bodies(db["mails"])
+    migrate_mail_dates(db["mails"])
@@ -0,0 +1,78 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+
+# METRICS_TIMING_HEADERS=1 iken her yanıta aşama süreleri Server-Timing başlığı olarak eklenir
+TIMING_HEADERS_ENABLED = os.getenv("METRICS_TIMING_HEADERS", "0") == "1"
+
+STAGE_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+STAGE_SECONDS = Histogram(
+    "gmail_categorizer_stage_seconds", "Aşama başına geçen süre", ["stage"], buckets=STAGE_BUCKETS
+)
+STAGE_ITEMS = Counter(
+    "gmail_categorizer_stage_items_total", "Aşamada işlenen öğe (mail) sayısı", ["stage"]
+)
+STAGE_ERRORS = Counter(
+    "gmail_categorizer_stage_errors_total", "Aşamada oluşan hata sayısı", ["stage"]
+)
+RETRIES = Counter(
+    "gmail_categorizer_retries_total", "Dış servislere yapılan tekrar deneme sayısı", ["service"]
+)
+CACHE_LOOKUPS = Counter(
+    "gmail_categorizer_classification_cache_total", "Sınıflandırma önbelleği sorguları", ["result"]
+)
+RULE_MATCHES = Counter(
+    "gmail_categorizer_rule_matches_total", "Modele gitmeden kuralla sınıflandırılan mailler", ["rule"]
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "gmail_categorizer_http_request_seconds", "API isteklerinin süresi",
+    ["method", "route", "status"], buckets=STAGE_BUCKETS
+)
+
+# İstek bazlı aşama süreleri (Server-Timing için); istek dışında None'dır
+_request_timings = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def timed(stage, items=0):
+    """
+    Bloğun süresini aşama histogramına yazar, hata olursa hata sayacını artırır.
+    Dekoratör olarak da kullanılabilir: @timed("parse")
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        if items:
+            STAGE_ITEMS.labels(stage).inc(items)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def start_request_timing():
+    """İstek başında çağrılır; bu context'te ölçülen aşamalar yanıt başlığına eklenir."""
+    return _request_timings.set({})
+
+
+def finish_request_timing(token, total_seconds):
+    """Server-Timing başlık değerini döndürür ve istek context'ini temizler."""
+    timings = _request_timings.get() or {}
+    _request_timings.reset(token)
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    parts.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def render_metrics():
+    """Prometheus metin formatındaki çıktı ve content type'ı döndürür."""
+    return generate_latest(), CONTENT_TYPE_LATEST
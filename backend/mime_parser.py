@@ -0,0 +1,128 @@
+import re
+import codecs
+import base64
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bozuk veya kötü niyetli mesajlarda sonsuz iç içe multipart'a karşı sınır
+MAX_PART_DEPTH = 10
+DEFAULT_CHARSET = "utf-8"
+
+_CHARSET_RE = re.compile(r'charset\s*=\s*"?([^";\s]+)"?', re.IGNORECASE)
+
+
+def _header(part, name):
+    for header in part.get('headers') or ():
+        if header.get('name', '').lower() == name:
+            return header.get('value', '')
+    return ''
+
+
+def part_charset(part):
+    """Parçanın Content-Type başlığındaki charset değerini döndürür (bilinmiyorsa utf-8)."""
+    match = _CHARSET_RE.search(_header(part, 'content-type'))
+    if not match:
+        return DEFAULT_CHARSET
+    charset = match.group(1).lower()
+    try:
+        codecs.lookup(charset)
+    except LookupError:
+        logger.warning(f"Bilinmeyen charset '{charset}', {DEFAULT_CHARSET} kullanılacak")
+        return DEFAULT_CHARSET
+    return charset
+
+
+def decode_part(part):
+    """Tek bir parçanın base64url gövdesini kendi charset'i ile metne çevirir."""
+    data = (part.get('body') or {}).get('data')
+    if not data:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+    except Exception as e:
+        logger.error(f"Parça base64 decode hatası: {str(e)}")
+        return None
+    charset = part_charset(part)
+    try:
+        return raw.decode(charset)
+    except UnicodeDecodeError:
+        # Başlıkta yanlış charset bildiren mailler de okunabilsin
+        return raw.decode(charset, errors='replace')
+
+
+def _is_attachment(part):
+    if part.get('filename'):
+        return True
+    if (part.get('body') or {}).get('attachmentId'):
+        return True
+    return _header(part, 'content-disposition').lower().startswith('attachment')
+
+
+class ParsedPayload:
+    """
+    Gmail payload'ının yapılandırılmış hali. html ve text ilk erişimde decode edilir,
+    body() sadece tercih edilen parçayı (HTML, yoksa düz metin) decode eder.
+    """
+
+    __slots__ = ('html_part', 'text_part', 'attachments', '_decoded')
+
+    def __init__(self, html_part=None, text_part=None, attachments=None):
+        self.html_part = html_part
+        self.text_part = text_part
+        self.attachments = attachments or []
+        self._decoded = {}
+
+    def _decode(self, key, part):
+        if key not in self._decoded:
+            self._decoded[key] = decode_part(part) if part is not None else None
+        return self._decoded[key]
+
+    @property
+    def html(self):
+        return self._decode('html', self.html_part)
+
+    @property
+    def text(self):
+        return self._decode('text', self.text_part)
+
+    def body(self):
+        return self.html or self.text
+
+
+def parse_payload(payload):
+    """
+    Payload ağacını tek geçişte ve recursion olmadan dolaşır. İlk HTML ve ilk düz metin
+    parçasını ve eklerin meta verisini bulur; hiçbir parçayı bu aşamada decode etmez.
+    """
+    html_part = None
+    text_part = None
+    attachments = []
+    stack = [(payload or {}, 0)]
+
+    while stack:
+        part, depth = stack.pop()
+        mime_type = part.get('mimeType', '').lower()
+
+        if _is_attachment(part):
+            body = part.get('body') or {}
+            attachments.append({
+                'filename': part.get('filename', ''),
+                'mime_type': mime_type,
+                'size': body.get('size', 0),
+                'attachment_id': body.get('attachmentId'),
+            })
+        elif mime_type == 'text/html':
+            if html_part is None:
+                html_part = part
+        elif mime_type == 'text/plain':
+            if text_part is None:
+                text_part = part
+        elif part.get('parts'):
+            if depth >= MAX_PART_DEPTH:
+                logger.warning("MIME ağacı çok derin, alt parçalar atlandı")
+                continue
+            # Yığından belge sırasıyla çıksınlar diye ters sırada eklenir
+            stack.extend((sub_part, depth + 1) for sub_part in reversed(part['parts']))
+
+    return ParsedPayload(html_part, text_part, attachments)
@@ -0,0 +1,181 @@
+import os
+import hmac
+import json
+import time
+import base64
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import requests
+from google.oauth2 import id_token
+from google.auth.transport.requests import Request
+from pymongo.errors import DuplicateKeyError
+
+from auth import bearer_token, AuthenticationError, GOOGLE_ISSUERS
+
+logger = logging.getLogger(__name__)
+
+# Gmail bildirimlerinin yayınlanacağı Pub/Sub topic'i (projects/<proje>/topics/<topic>); boşsa push kapalı
+PUSH_TOPIC = os.getenv("GMAIL_PUSH_TOPIC", "")
+# Pub/Sub push aboneliğinin URL'ine eklenen ?token=... değeri
+PUSH_VERIFICATION_TOKEN = os.getenv("GMAIL_PUSH_VERIFICATION_TOKEN", "")
+# Abonelikte kimlik doğrulama açıksa Pub/Sub'ın imzaladığı OIDC token'ının audience'ı (genelde push URL'i)
+PUSH_AUDIENCE = os.getenv("GMAIL_PUSH_AUDIENCE", "")
+# OIDC token'ını üreten servis hesabı; boşsa sadece imza ve audience kontrol edilir
+PUSH_SERVICE_ACCOUNT = os.getenv("GMAIL_PUSH_SERVICE_ACCOUNT", "")
+# Aynı kullanıcı için bu süre içinde gelen bildirimler tek senkronizasyonda birleştirilir (saniye)
+DEBOUNCE_SECONDS = float(os.getenv("GMAIL_PUSH_DEBOUNCE_SECONDS", "2"))
+# Sürekli bildirim gelse bile ilk bildirimden en geç bu kadar sonra senkronizasyon başlar (saniye)
+MAX_DELAY_SECONDS = float(os.getenv("GMAIL_PUSH_MAX_DELAY_SECONDS", "10"))
+# Watch süresi dolmadan bu kadar önce yenilenir (saniye); Gmail watch'ları 7 gün geçerlidir
+WATCH_RENEW_MARGIN_SECONDS = int(os.getenv("GMAIL_WATCH_RENEW_MARGIN_SECONDS", "86400"))
+
+
+class InvalidNotificationError(Exception):
+    """Pub/Sub push isteği beklenen formatta değil."""
+
+
+class PushAuthenticationError(Exception):
+    """Push isteği Pub/Sub aboneliğimizden geldiği doğrulanamadı."""
+
+
+def push_auth_configured():
+    """Push endpoint'i sadece token veya OIDC doğrulaması ayarlıysa açılır."""
+    return bool(PUSH_VERIFICATION_TOKEN or PUSH_AUDIENCE)
+
+
+_oidc_request = Request(session=requests.Session())
+
+
+def verify_push_request(token=None, authorization=None):
+    """
+    Push isteğini doğrular: GMAIL_PUSH_AUDIENCE ayarlıysa Authorization başlığındaki Pub/Sub OIDC
+    token'ı (imza, audience, issuer, servis hesabı), ayarlı değilse URL'deki doğrulama anahtarı kontrol edilir.
+    """
+    if PUSH_AUDIENCE:
+        try:
+            claims = id_token.verify_oauth2_token(bearer_token(authorization), _oidc_request, PUSH_AUDIENCE)
+        except (AuthenticationError, ValueError) as e:
+            raise PushAuthenticationError(f"Geçersiz Pub/Sub kimlik token'ı: {str(e)}") from e
+        if claims.get("iss") not in GOOGLE_ISSUERS:
+            raise PushAuthenticationError("Pub/Sub kimlik token'ı Google tarafından verilmemiş.")
+        if PUSH_SERVICE_ACCOUNT and (claims.get("email") != PUSH_SERVICE_ACCOUNT or not claims.get("email_verified")):
+            raise PushAuthenticationError("Pub/Sub kimlik token'ı beklenen servis hesabına ait değil.")
+        return
+    if not PUSH_VERIFICATION_TOKEN:
+        raise PushAuthenticationError("Push doğrulaması ayarlanmadı.")
+    if not token or not hmac.compare_digest(token, PUSH_VERIFICATION_TOKEN):
+        raise PushAuthenticationError("Geçersiz doğrulama anahtarı.")
+
+
+def parse_notification(envelope):
+    """
+    Pub/Sub push gövdesinden (e-posta adresi, historyId) çıkarır.
+    Gövde: {"message": {"data": base64({"emailAddress": ..., "historyId": ...}), ...}, "subscription": ...}
+    """
+    try:
+        data = json.loads(base64.b64decode(envelope["message"]["data"]))
+        return data["emailAddress"], int(data["historyId"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise InvalidNotificationError(f"Geçersiz Gmail bildirimi: {str(e)}") from e
+
+
+def register_watch(service, topic=PUSH_TOPIC):
+    """Gelen kutusu için users().watch() kaydı yapar; {"historyId", "expiration"(ms)} döndürür."""
+    return service.users().watch(userId='me', body={
+        "topicName": topic,
+        "labelIds": ["INBOX"],
+        "labelFilterBehavior": "include"
+    }).execute()
+
+
+def watch_needs_renewal(expiration_ms, margin_seconds=WATCH_RENEW_MARGIN_SECONDS):
+    if not expiration_ms:
+        return True
+    return int(expiration_ms) / 1000 - time.time() < margin_seconds
+
+
+def process_owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lease(collection, name, owner, ttl_seconds):
+    """
+    Birden fazla worker/replika içinden sadece birinin periyodik işi çalıştırması için Mongo'da
+    süreli kilit alır. Kilit boşsa, süresi dolmuşsa veya zaten bizdeyse süresi uzatılır ve True döner.
+    """
+    now = datetime.utcnow()
+    try:
+        collection.find_one_and_update(
+            {"_id": name, "$or": [{"expires_at": {"$lt": now}}, {"owner": owner}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Kayıt var ama başka bir sürece ait ve süresi dolmamış
+        return False
+    return True
+
+
+class PushIngestor:
+    """
+    Gmail push bildirimlerini kullanıcı bazında debounce ederek sync_user(user_email, history_id) çağırır.
+    Bir kullanıcının senkronizasyonu sürerken gelen bildirimler kaybolmaz; iş bitince bir tur daha çalışır.
+    """
+
+    def __init__(self, sync_user, debounce_seconds=DEBOUNCE_SECONDS, max_delay_seconds=MAX_DELAY_SECONDS):
+        self.sync_user = sync_user
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.lock = threading.Lock()
+        self.timers = {}
+        self.first_notified = {}
+        self.latest_history = {}
+        self.running = set()
+        self.pending = set()
+
+    def notify(self, user_email, history_id=None):
+        with self.lock:
+            if history_id is not None:
+                self.latest_history[user_email] = max(history_id, self.latest_history.get(user_email, 0))
+            if user_email in self.running:
+                self.pending.add(user_email)
+                return
+            self._schedule(user_email)
+
+    def _schedule(self, user_email):
+        now = time.monotonic()
+        first = self.first_notified.setdefault(user_email, now)
+        timer = self.timers.get(user_email)
+        if timer is not None:
+            timer.cancel()
+        delay = min(self.debounce_seconds, max(first + self.max_delay_seconds - now, 0))
+        timer = threading.Timer(delay, self._run, args=(user_email,))
+        timer.daemon = True
+        self.timers[user_email] = timer
+        timer.start()
+
+    def _run(self, user_email):
+        with self.lock:
+            self.timers.pop(user_email, None)
+            self.first_notified.pop(user_email, None)
+            history_id = self.latest_history.pop(user_email, None)
+            self.running.add(user_email)
+        try:
+            self.sync_user(user_email, history_id)
+        except Exception as e:
+            logger.error(f"Push senkronizasyonu başarısız ({user_email}): {str(e)}")
+        finally:
+            with self.lock:
+                self.running.discard(user_email)
+                if user_email in self.pending:
+                    self.pending.discard(user_email)
+                    self._schedule(user_email)
+
+    def shutdown(self):
+        with self.lock:
+            for timer in self.timers.values():
+                timer.cancel()
+            self.timers.clear()
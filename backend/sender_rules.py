@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import defaultdict
+from email.utils import parseaddr
+
+from mail_classifier import LABELS, SUBSCRIPTION_LABEL
+
+logger = logging.getLogger(__name__)
+
+SENDER_RULES_ENABLED = os.getenv("SENDER_RULES_ENABLED", "1") == "1"
+# {"senders": {"adres": "kategori"}, "domains": {"alan.adı": "kategori"}} formatında kural dosyası
+SENDER_RULES_PATH = os.getenv("SENDER_RULES_PATH", "sender_rules.json")
+# Göndericinin kategorisinin öğrenilmesi için gereken en az model skoru, mail sayısı ve kategori oranı
+LEARN_MIN_CONFIDENCE = float(os.getenv("SENDER_LEARN_MIN_CONFIDENCE", "0.8"))
+LEARN_MIN_COUNT = int(os.getenv("SENDER_LEARN_MIN_COUNT", "3"))
+LEARN_MIN_AGREEMENT = float(os.getenv("SENDER_LEARN_MIN_AGREEMENT", "0.9"))
+# Öğrenilen eşlemeler en fazla bu sıklıkla veritabanından yeniden hesaplanır (saniye)
+LEARN_REFRESH_SECONDS = float(os.getenv("SENDER_LEARN_REFRESH_SECONDS", "600"))
+# List-Unsubscribe başlığı olan maillerde modelin abonelik skoru bu katsayıyla çarpılıp skorlar yeniden normalize edilir
+LIST_UNSUBSCRIBE_BOOST = float(os.getenv("SENDER_LIST_UNSUBSCRIBE_BOOST", "2.0"))
+
+# Sadece model sonuçları öğrenmede kullanılır; kural sonuçlarının classified_by alanı "rule:" ile başlar
+MODEL_SOURCE = "model"
+# List-Unsubscribe ipucuyla düzeltilmiş model sonuçları; göndericiyi sabit kurala dönüştürmemek için öğrenilmez
+LIST_UNSUBSCRIBE_SOURCE = "model:list_unsubscribe"
+
+# Alan adı kuralları kayıt edilebilir alan adında (banka.com.tr) durur; bu genel son ekler
+# (ve tek başına TLD'ler) kural olarak eşleşmez
+PUBLIC_SECOND_LEVEL_SUFFIXES = {
+    "com.tr", "org.tr", "net.tr", "gov.tr", "edu.tr", "k12.tr", "bel.tr", "gen.tr", "av.tr",
+    "biz.tr", "info.tr", "tv.tr", "web.tr", "pol.tr", "tsk.tr", "mil.tr",
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "me.uk", "ltd.uk", "plc.uk",
+    "com.au", "net.au", "org.au", "edu.au", "gov.au",
+    "co.jp", "ne.jp", "or.jp", "ac.jp", "go.jp",
+    "com.br", "net.br", "org.br", "gov.br",
+    "co.nz", "org.nz", "co.za", "co.in", "net.in", "org.in", "co.kr", "or.kr",
+    "com.cn", "net.cn", "org.cn", "com.mx", "com.ar", "com.sg", "com.hk", "com.tw",
+    "com.de", "com.cy", "com.ua", "com.ru",
+}
+
+
+def sender_address(sender):
+    """'Ad <adres@alan.com>' biçimindeki göndericiden küçük harfli e-posta adresini çıkarır."""
+    return parseaddr(sender or '')[1].strip().lower()
+
+
+def registrable_domain(domain):
+    """mail.banka.com.tr -> banka.com.tr, e.linkedin.com -> linkedin.com"""
+    parts = domain.split('.')
+    if len(parts) >= 3 and '.'.join(parts[-2:]) in PUBLIC_SECOND_LEVEL_SUFFIXES:
+        return '.'.join(parts[-3:])
+    return '.'.join(parts[-2:])
+
+
+def _parent_domains(address):
+    # mail.banka.com.tr -> mail.banka.com.tr, banka.com.tr (com.tr gibi genel son ekler hariç)
+    domain = address.rpartition('@')[2]
+    parts = domain.split('.')
+    registrable_parts = registrable_domain(domain).count('.') + 1
+    return ['.'.join(parts[index:]) for index in range(len(parts) - registrable_parts + 1)]
+
+
+def _valid_rules(rules, kind):
+    valid = {}
+    for key, category in (rules or {}).items():
+        if category not in LABELS:
+            logger.warning(f"Geçersiz {kind} kuralı atlandı: {key} -> {category}")
+            continue
+        valid[key.strip().lower()] = category
+    return valid
+
+
+def _valid_domain_rules(rules):
+    valid = {}
+    for domain, category in _valid_rules(rules, "alan adı").items():
+        if '.' not in domain or domain in PUBLIC_SECOND_LEVEL_SUFFIXES:
+            logger.warning(f"Genel son ek için alan adı kuralı atlandı: {domain} -> {category}")
+            continue
+        valid[domain] = category
+    return valid
+
+
+def apply_list_unsubscribe_hint(result, boost=LIST_UNSUBSCRIBE_BOOST):
+    """
+    List-Unsubscribe başlığını kesin kural yerine modelin skorlarına ön bilgi olarak uygular:
+    abonelik skoru `boost` ile çarpılır, skorlar yeniden normalize edilir ve son karar modelde kalır.
+    """
+    scores = dict(result['all_scores'])
+    if SUBSCRIPTION_LABEL not in scores:
+        return result
+    scores[SUBSCRIPTION_LABEL] *= boost
+    total = sum(scores.values())
+    if total <= 0:
+        return result
+    scores = {label: score / total for label, score in scores.items()}
+    predicted_class = max(scores, key=scores.get)
+    return {
+        **result,
+        'predicted_class': predicted_class,
+        'confidence_score': scores[predicted_class],
+        'all_scores': scores,
+        'classified_by': LIST_UNSUBSCRIBE_SOURCE
+    }
+
+
+class SenderRules:
+    """
+    Modelden önce çalışan kural katmanı. Sırasıyla tam gönderici kuralı, alan adı kuralı ve
+    kullanıcının geçmiş sonuçlarından öğrenilen gönderici kategorisine bakar; eşleşen mailler
+    için inference yapılmaz. List-Unsubscribe başlığı kural değildir, modelin skorlarına ipucu olarak eklenir.
+    """
+
+    def __init__(self, sender_rules=None, domain_rules=None, collection=None):
+        self.sender_rules = _valid_rules(sender_rules, "gönderici")
+        self.domain_rules = _valid_domain_rules(domain_rules)
+        self.collection = collection
+        # Kullanıcı bazında: e-posta -> {gönderici adresi: kategori} ve son başarılı yenileme zamanı
+        self.learned = {}
+        self.learned_at = {}
+        self.refreshing = set()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path=SENDER_RULES_PATH, collection=None):
+        rules = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as rules_file:
+                rules = json.load(rules_file)
+            logger.info(f"Gönderici kuralları yüklendi: {path}")
+        return cls(rules.get("senders"), rules.get("domains"), collection=collection)
+
+    def refresh_learned(self, user_email, force=False):
+        """
+        Kullanıcının veritabanındaki yüksek skorlu model sonuçlarından gönderici -> kategori eşlemesini
+        yeniden hesaplar. Bir gönderici en az LEARN_MIN_COUNT mailinin LEARN_MIN_AGREEMENT oranında aynı
+        kategoriye düştüyse öğrenilir. Hata import'u durdurmaz; eski eşleme kalır ve sonraki import'ta tekrar denenir.
+        """
+        if self.collection is None:
+            return
+        with self.lock:
+            learned_at = self.learned_at.get(user_email)
+            if user_email in self.refreshing or (
+                not force and learned_at is not None and time.monotonic() - learned_at < LEARN_REFRESH_SECONDS
+            ):
+                return
+            self.refreshing.add(user_email)
+
+        try:
+            learned = self._learn(user_email)
+        except Exception as e:
+            logger.error(f"Gönderici kategorileri öğrenilemedi ({user_email}): {str(e)}")
+            return
+        finally:
+            with self.lock:
+                self.refreshing.discard(user_email)
+
+        with self.lock:
+            self.learned[user_email] = learned
+            self.learned_at[user_email] = time.monotonic()
+        logger.info(f"{user_email} için {len(learned)} gönderici kategorisi öğrenildi")
+
+    def _learn(self, user_email):
+        pipeline = [
+            {"$match": {
+                "user_email": user_email,
+                "confidence_score": {"$gte": LEARN_MIN_CONFIDENCE},
+                "classified_by": {"$in": [MODEL_SOURCE, None]}
+            }},
+            {"$group": {"_id": {"sender": "$sender", "category": "$predicted_class"}, "count": {"$sum": 1}}}
+        ]
+        counts = defaultdict(lambda: defaultdict(int))
+        for row in self.collection.aggregate(pipeline):
+            address = sender_address(row["_id"].get("sender"))
+            if address:
+                counts[address][row["_id"].get("category")] += row["count"]
+
+        learned = {}
+        for address, categories in counts.items():
+            category, count = max(categories.items(), key=lambda item: item[1])
+            total = sum(categories.values())
+            if category in LABELS and count >= LEARN_MIN_COUNT and count / total >= LEARN_MIN_AGREEMENT:
+                learned[address] = category
+        return learned
+
+    def match(self, mail, user_email=None):
+        """Mail bir kurala uyuyorsa (kategori, kural_adı), uymuyorsa None döndürür."""
+        address = sender_address(mail.get('sender'))
+        if not address:
+            return None
+        if address in self.sender_rules:
+            return self.sender_rules[address], "rule:sender"
+        for domain in _parent_domains(address):
+            if domain in self.domain_rules:
+                return self.domain_rules[domain], "rule:domain"
+        learned = self.learned.get(user_email, {})
+        if address in learned:
+            return learned[address], "rule:learned"
+        return None
@@ -1,9 +1,14 @@
 # Gerekli kütüphaneleri içe aktar
 import os
-import base64
-import re
+import time
+import random
+import logging
+from email.utils import parsedate_to_datetime
+from mime_parser import parse_payload
+from metrics import timed, RETRIES
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from datetime import datetime, timedelta, timezone
@@ -14,6 +19,22 @@ SCOPES = [
     'https://www.googleapis.com/auth/gmail.send'
 ]
 
+# Tek bir batch isteğine konacak mesaj sayısı. Gmail en fazla 100'e izin verir,
+# ancak 50'nin üzerinde rate limit hataları belirgin şekilde artıyor.
+BATCH_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", "50"))
+# messages.list için sayfa başına en fazla 500 sonuç döner
+LIST_PAGE_SIZE = 500
+MAX_RETRIES = int(os.getenv("GMAIL_MAX_RETRIES", "5"))
+MAX_BACKOFF_SECONDS = 32
+
+# format='metadata' ile sadece bu başlıklar istenir; gövde ve parça yapısı indirilmez
+METADATA_HEADERS = ['From', 'Subject', 'Date', 'List-Unsubscribe']
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+
+logger = logging.getLogger(__name__)
+
 
 
 list_of_daily_mails = []
@@ -21,7 +42,8 @@ list_of_snippets = []
 
 
 
-def authenticate_gmail():
+def load_credentials():
+    """token.json'dan kimlik bilgilerini yükler, gerekirse yeniler veya OAuth akışını başlatır."""
     creds = None
     token_file = f'token.json'
     if os.path.exists(token_file):
@@ -33,265 +55,291 @@ def authenticate_gmail():
             try:
                 creds.refresh(Request())
             except Exception as e:
-                print("Token yenileme sırasında hata oluştu:", str(e))
+                logger.error(f"Token yenileme sırasında hata oluştu: {str(e)}")
                 creds = None
         if not creds:
             flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
             creds = flow.run_local_server(port=0)
         with open(token_file, 'w') as token:
             token.write(creds.to_json())
-    return build('gmail', 'v1', credentials=creds)
+    return creds
 
 
+def authenticate_gmail():
+    return build('gmail', 'v1', credentials=load_credentials())
 
 
-def test():
-    global list_of_daily_mails
-    global list_of_snippets
 
-    list_of_daily_mails = []
-    list_of_snippets = []     
 
-    service = authenticate_gmail()
+def get_body_from_payload(payload):
+    """Mesajın tercih edilen gövdesini (HTML, yoksa düz metin) döndürür; diğer parçalar decode edilmez."""
+    content = parse_payload(payload).body() if payload else None
+    return content if content else "İçerik alınamadı."
 
-    today = datetime.now()
-    week_ago = today - timedelta(days=7)
-    week_ago_utc = week_ago.astimezone(timezone.utc)
-    after_ts = int(week_ago_utc.timestamp())
 
-    query = f'after:{after_ts}'
+class HistoryExpiredError(Exception):
+    """Kayıtlı historyId Gmail tarafından artık tutulmuyor, tam senkronizasyon gerekir."""
 
-    results = service.users().messages().list(userId='me', q=query, maxResults=100).execute()
-    mails = results.get('messages', [])
-    
-    for mail in mails:
-        msg_id = mail['id']
-        mail_data = service.users().messages().get(userId='me', id=msg_id, format='full').execute()
-        payload = mail_data.get('payload', {})
-        
-        # Başlıkları al
-        headers = payload.get('headers', [])
-        subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), 'Konu yok')
-        sender = next((h['value'] for h in headers if h['name'].lower() == 'from'), 'Bilinmeyen Gönderici')
-        
-        print(f"\nE-posta ID: {msg_id}")
-        print(f"Konu: {subject}")
-        print(f"Gönderen: {sender}")
-        
-        def get_content_from_parts(parts):
-            html_content = None
-            plain_content = None
-            
-            for part in parts:
-                mime_type = part.get('mimeType', '')
-                
-                # Multipart içerik kontrolü
-                if mime_type.startswith('multipart/'):
-                    sub_parts = part.get('parts', [])
-                    sub_content = get_content_from_parts(sub_parts)
-                    if sub_content:
-                        if isinstance(sub_content, tuple):
-                            html_content = html_content or sub_content[0]
-                            plain_content = plain_content or sub_content[1]
-                        else:
-                            html_content = html_content or sub_content
-                
-                # HTML içerik kontrolü
-                elif mime_type == 'text/html':
-                    data = part.get('body', {}).get('data')
-                    if data:
-                        try:
-                            content = base64.urlsafe_b64decode(data).decode('utf-8')
-                            html_content = content
-                        except Exception as e:
-                            print(f"HTML decode hatası: {str(e)}")
-                
-                # Düz metin kontrolü
-                elif mime_type == 'text/plain':
-                    data = part.get('body', {}).get('data')
-                    if data:
-                        try:
-                            content = base64.urlsafe_b64decode(data).decode('utf-8')
-                            plain_content = content
-                        except Exception as e:
-                            print(f"Text decode hatası: {str(e)}")
-            
-            # Eğer hem HTML hem düz metin varsa, ikisini de döndür
-            if html_content and plain_content:
-                return (html_content, plain_content)
-            # Sadece HTML varsa
-            elif html_content:
-                return html_content
-            # Sadece düz metin varsa
-            elif plain_content:
-                return plain_content
-            
-            return None
-        
-        # İçeriği al
-        content = get_content_from_parts(payload.get('parts', []))
-        
-        if content:
-            if isinstance(content, tuple):
-                html_content, plain_content = content
-                print("\nHTML İçerik:")
-                print(html_content)
-                print("\nDüz Metin İçerik:")
-                print(plain_content)
-            else:
-                print("\nİçerik:")
-                print(content)
-        else:
-            # Eğer parts yoksa, doğrudan body'den içeriği al
-            body_data = payload.get('body', {}).get('data')
-            if body_data:
-                try:
-                    content = base64.urlsafe_b64decode(body_data).decode('utf-8')
-                    print("\nİçerik (Body):")
-                    print(content)
-                except Exception as e:
-                    print(f"Body decode hatası: {str(e)}")
 
+def _is_retryable(exception):
+    """Hatanın tekrar denemeye değer (rate limit / geçici sunucu hatası) olup olmadığını söyler."""
+    if not isinstance(exception, HttpError):
+        return False
+    status = exception.resp.status
+    if status in RETRYABLE_STATUSES:
+        return True
+    if status == 403:
+        try:
+            details = exception.error_details or []
+        except Exception:
+            details = []
+        return any(d.get('reason') in RATE_LIMIT_REASONS for d in details if isinstance(d, dict))
+    return False
 
 
-def get_body_from_payload(payload):
+def _backoff(attempt):
+    """Exponential backoff + jitter ile bekleme süresi (saniye)."""
+    return min(2 ** attempt + random.random(), MAX_BACKOFF_SECONDS)
+
+
+def fetch_messages(service, msg_ids, format='full', batch_size=BATCH_SIZE, max_retries=MAX_RETRIES, quota=None):
     """
-    Mesajın payload bilgisinden mail içeriğini recursive olarak çıkarır.
-    HTML içeriğini korur ve düzgün şekilde işler.
+    Verilen mesaj ID'lerini Gmail batch istekleri ile toplu olarak çeker.
+    format='metadata' iken sadece METADATA_HEADERS başlıkları ve snippet döner.
+    Her batch tek bir HTTP round trip'tir. Rate limit ve geçici hatalar alan
+    mesajlar backoff sonrası tekrar denenir, kalıcı hatalar atlanır.
+    quota verilirse her batch'ten önce quota("messages.get", adet) ile hesabın kotası ayrılır.
+    Sonuçlar msg_ids sırasıyla döner.
     """
-    if not payload:
-        return "İçerik alınamadı."
-    
-    def extract_content_from_part(part, depth=0, max_depth=10):
-        if depth > max_depth:
-            return None
-            
-        mime_type = part.get('mimeType', '')
-        
-        # Multipart içerik kontrolü
-        if mime_type.startswith('multipart/'):
-            parts = part.get('parts', [])
-            html_content = None
-            plain_text = None
-            
-            for sub_part in parts:
-                content = extract_content_from_part(sub_part, depth + 1)
-                sub_mime = sub_part.get('mimeType', '')
-                if content:
-                    if sub_mime == 'text/html':
-                        html_content = content
-                    elif sub_mime == 'text/plain' and not plain_text:
-                        plain_text = content
-            
-            return html_content or plain_text
-            
-        # HTML içerik kontrolü
-        elif mime_type == 'text/html':
-            body_data = part.get('body', {}).get('data')
-            if body_data:
-                try:
-                    return base64.urlsafe_b64decode(body_data).decode('utf-8')
-                except Exception as e:
-                    print(f"HTML decode hatası: {str(e)}")
-                    return None
-                    
-        # Düz metin kontrolü
-        elif mime_type == 'text/plain':
-            body_data = part.get('body', {}).get('data')
-            if body_data:
-                try:
-                    return base64.urlsafe_b64decode(body_data).decode('utf-8')
-                except Exception as e:
-                    print(f"Text decode hatası: {str(e)}")
-                    return None
-        
-        # Alt parçaları kontrol et
-        elif 'parts' in part:
-            for sub_part in part.get('parts', []):
-                content = extract_content_from_part(sub_part, depth + 1)
-                if content:
-                    return content
-        
-        return None
-    
-    content = extract_content_from_part(payload)
-    return content if content else "İçerik alınamadı."
+    msg_ids = list(msg_ids)
+    fetched = {}
+    pending = msg_ids
+    attempt = 0
+
+    while pending:
+        retry_ids = []
+
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+
+            def callback(request_id, response, exception):
+                if exception is None:
+                    fetched[request_id] = response
+                elif _is_retryable(exception):
+                    retry_ids.append(request_id)
+                else:
+                    logger.error(f"Mail {request_id} alınırken hata: {str(exception)}")
+
+            batch = service.new_batch_http_request(callback=callback)
+            for msg_id in chunk:
+                if format == 'metadata':
+                    request = service.users().messages().get(
+                        userId='me', id=msg_id, format=format, metadataHeaders=METADATA_HEADERS
+                    )
+                else:
+                    request = service.users().messages().get(userId='me', id=msg_id, format=format)
+                batch.add(request, request_id=msg_id)
+            if quota is not None:
+                quota("messages.get", len(chunk))
+            try:
+                with timed("gmail_get", items=len(chunk)):
+                    batch.execute()
+            except HttpError as e:
+                # Batch isteğinin tamamı reddedildiyse hepsini tekrar dene
+                if not _is_retryable(e):
+                    raise
+                retry_ids.extend(i for i in chunk if i not in fetched and i not in retry_ids)
+
+        if not retry_ids:
+            break
+        if attempt >= max_retries:
+            logger.error(f"{len(retry_ids)} adet mail {max_retries} denemeden sonra alınamadı")
+            break
+
+        delay = _backoff(attempt)
+        RETRIES.labels("gmail").inc(len(retry_ids))
+        logger.warning(f"Rate limit / geçici hata: {len(retry_ids)} mail {delay:.1f} sn sonra tekrar denenecek")
+        time.sleep(delay)
+        attempt += 1
+        pending = retry_ids
+
+    return [fetched[msg_id] for msg_id in msg_ids if msg_id in fetched]
+
+
+@timed("parse")
+def parse_mail(mail_data, default_date=None, with_body=True):
+    """
+    Gmail mesaj kaynağını uygulamanın kullandığı mail sözlüğüne dönüştürür.
+    with_body=False (format='metadata' yanıtları) iken content None olur, gövde sonradan çekilir.
+    """
+    msg_id = mail_data['id']
+    snippet = mail_data.get('snippet', '')
+    payload = mail_data.get('payload', {})
+
+    # İçeriği al; sadece tercih edilen parça decode edilir
+    if with_body:
+        parsed = parse_payload(payload)
+        content = parsed.body() or "İçerik alınamadı."
+        attachments = parsed.attachments
+    else:
+        content = None
+        attachments = []
+
+    headers = payload.get('headers', [])
+    sender = 'Bilinmeyen Gönderici'
+    subject = 'Konu yok'
+    date_str = ''
+    list_unsubscribe = False
+
+    for header in headers:
+        name = header.get('name', '').lower()
+        if name == 'from':
+            sender = header.get('value', 'Bilinmeyen Gönderici')
+        elif name == 'subject':
+            subject = header.get('value', 'Konu yok')
+        elif name == 'date':
+            date_str = header.get('value', '')
+        elif name == 'list-unsubscribe':
+            list_unsubscribe = bool(header.get('value'))
+
+    received_date = default_date or datetime.now()
+    if date_str:
+        try:
+            received_date = parsedate_to_datetime(date_str)
+        except Exception as e:
+            logger.warning(f"Tarih ayrıştırma hatası: {str(e)}")
+
+    return {
+        'id': msg_id,
+        'content': content,  # HTML içeriği
+        'snippet': snippet,
+        'date': received_date,
+        'sender': sender,
+        'subject': subject if subject and subject != 'Konu yok' else snippet,
+        'attachments': attachments,
+        'list_unsubscribe': list_unsubscribe
+    }
+
+
+def days_query(days=7):
+    """Son `days` günün maillerini getiren Gmail arama sorgusunu üretir."""
+    since = datetime.now() - timedelta(days=days)
+    after_ts = int(since.astimezone(timezone.utc).timestamp())
+    return f'after:{after_ts}'
+
+
+def list_message_ids(service, query, page_size=LIST_PAGE_SIZE, quota=None):
+    """
+    Sorguya uyan tüm mesaj ID'lerini nextPageToken'ı takip ederek sayfa sayfa döndürür.
+    """
+    page_token = None
+    while True:
+        if quota is not None:
+            quota("messages.list")
+        with timed("gmail_list"):
+            results = service.users().messages().list(
+                userId='me', q=query, maxResults=page_size, pageToken=page_token
+            ).execute()
+        for mail in results.get('messages', []):
+            yield mail['id']
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+
+
+def iter_mails(service, msg_ids, batch_size=BATCH_SIZE):
+    """
+    Mesaj ID akışını batch'ler halinde çeker ve ayrıştırılmış mailleri geldikçe döndürür.
+    Bellekte aynı anda en fazla bir batch'lik mail gövdesi tutulur.
+    """
+    def fetch_chunk(chunk):
+        today = datetime.now()
+        for mail_data in fetch_messages(service, chunk, batch_size=batch_size):
+            try:
+                yield parse_mail(mail_data, default_date=today)
+            except Exception as e:
+                logger.error(f"Mail {mail_data.get('id')} işlenirken hata: {str(e)}")
+
+    chunk = []
+    for msg_id in msg_ids:
+        chunk.append(msg_id)
+        if len(chunk) >= batch_size:
+            yield from fetch_chunk(chunk)
+            chunk = []
+    if chunk:
+        yield from fetch_chunk(chunk)
+
+
+def iter_daily_mails(service=None, days=7):
+    """Son `days` günün tüm maillerini (100 sınırı olmadan) akış halinde döndürür."""
+    if service is None:
+        service = authenticate_gmail()
+    yield from iter_mails(service, list_message_ids(service, days_query(days)))
+
+
+def list_history_changes(service, start_history_id, page_size=LIST_PAGE_SIZE, quota=None):
+    """
+    start_history_id'den bu yana eklenen ve silinen mesajları users().history().list ile bulur.
+    (eklenen_idler, silinen_idler, son_history_id) döndürür. Geçmiş penceresi dolmuşsa
+    (Gmail 404 döner) HistoryExpiredError fırlatır.
+    """
+    added_ids = {}
+    removed_ids = set()
+    history_id = start_history_id
+    page_token = None
+
+    while True:
+        if quota is not None:
+            quota("history.list")
+        try:
+            with timed("gmail_history"):
+                results = service.users().history().list(
+                    userId='me',
+                    startHistoryId=start_history_id,
+                    historyTypes=['messageAdded', 'messageDeleted'],
+                    maxResults=page_size,
+                    pageToken=page_token
+                ).execute()
+        except HttpError as e:
+            if e.resp.status == 404:
+                raise HistoryExpiredError(f"historyId {start_history_id} artık geçerli değil") from e
+            raise
+
+        for record in results.get('history', []):
+            for added in record.get('messagesAdded', []):
+                msg_id = added['message']['id']
+                removed_ids.discard(msg_id)
+                added_ids[msg_id] = None
+            for deleted in record.get('messagesDeleted', []):
+                msg_id = deleted['message']['id']
+                added_ids.pop(msg_id, None)
+                removed_ids.add(msg_id)
+
+        history_id = results.get('historyId', history_id)
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+
+    return list(added_ids), list(removed_ids), history_id
 
 
 def take_daily_mails():
+    """Geriye uyumluluk için: tüm haftalık mailleri liste olarak döndürür."""
     global list_of_daily_mails
     global list_of_snippets
     
-    list_of_daily_mails = []
-    list_of_snippets = []
-    
-    service = authenticate_gmail()
-    
-    today = datetime.now()
-    week_ago = today - timedelta(days=7)
-    week_ago_utc = week_ago.astimezone(timezone.utc)
-    after_ts = int(week_ago_utc.timestamp())
+    list_of_daily_mails = list(iter_daily_mails())
+    list_of_snippets = [mail['snippet'] for mail in list_of_daily_mails]
     
-    query = f'after:{after_ts}'
-    
-    results = service.users().messages().list(userId='me', q=query, maxResults=100).execute()
-    mails = results.get('messages', [])
-    
-    if not mails:
-        print("Son 7 gün için e-posta bulunamadı.")
+    if not list_of_daily_mails:
+        logger.info("Son 7 gün için e-posta bulunamadı.")
     else:
-        print(f"Son günlerin e-postaları: {len(mails)} adet")
-        for mail in mails:
-            msg_id = mail['id']
-            try:
-                mail_data = service.users().messages().get(userId='me', id=msg_id, format='full').execute()
-                snippet = mail_data.get('snippet', '')
-                payload = mail_data.get('payload', {})
-                
-                # İçeriği al
-                content = get_body_from_payload(payload)
-                
-                headers = payload.get('headers', [])
-                sender = 'Bilinmeyen Gönderici'
-                subject = 'Konu yok'
-                date_str = ''
-                
-                for header in headers:
-                    name = header.get('name', '').lower()
-                    if name == 'from':
-                        sender = header.get('value', 'Bilinmeyen Gönderici')
-                    elif name == 'subject':
-                        subject = header.get('value', 'Konu yok')
-                    elif name == 'date':
-                        date_str = header.get('value', '')
-                
-                received_date = today
-                if date_str:
-                    try:
-                        from email.utils import parsedate_to_datetime
-                        received_date = parsedate_to_datetime(date_str)
-                    except Exception as e:
-                        print(f"Tarih ayrıştırma hatası: {str(e)}")
-                
-                mail_info = {
-                    'id': msg_id,
-                    'content': content,  # HTML içeriği
-                    'snippet': snippet,
-                    'date': received_date,
-                    'sender': sender,
-                    'subject': subject if subject and subject != 'Konu yok' else snippet,
-                    'body': content  # Eski uyumluluk için body alanını da ekle
-                }
-                
-                list_of_snippets.append(snippet)
-                list_of_daily_mails.append(mail_info)
-                
-            except Exception as e:
-                print(f"Mail {msg_id} alınırken hata: {str(e)}")
+        logger.info(f"Son günlerin e-postaları: {len(list_of_daily_mails)} adet")
     
     return list_of_daily_mails, list_of_snippets
 
 
 
 if __name__ == "__main__":
-    test()
\ No newline at end of file
+    for mail in iter_daily_mails():
+        print(f"{mail['id']} | {mail['sender']} | {mail['subject']}")
@@ -0,0 +1,32 @@
+import os
+import sys
+
+# api modülü ortam değişkenlerini import sırasında okuduğu için önce ayarlanır
+os.environ["MONGODB_MOCK"] = "1"
+os.environ.setdefault("HF_TOKEN", "test")
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+import pytest  # noqa: E402
+
+TEST_USER = "kullanici@example.com"
+COLLECTIONS = ("mails", "deleted_mails", "user_sessions", "mail_stats", "import_jobs", "classification_cache")
+
+
+@pytest.fixture
+def api_module():
+    import api
+    for name in COLLECTIONS:
+        api.db[name].delete_many({})
+    api.app.dependency_overrides[api.get_user_email] = lambda: TEST_USER
+    yield api
+    api.app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def client(api_module):
+    from fastapi.testclient import TestClient
+    with TestClient(api_module.app) as test_client:
+        yield test_client
@@ -0,0 +1,75 @@
+import time
+from datetime import datetime
+
+import pytest
+
+import auth
+from conftest import TEST_USER
+from mail_storage import upsert_operation, assign_legacy_owner
+
+OTHER_USER = "diger@example.com"
+
+
+@pytest.fixture
+def google_tokens(api_module, monkeypatch):
+    """ID token doğrulamasını sahte token -> e-posta eşlemesiyle değiştirir; imza kontrolü Google kütüphanesindedir."""
+    tokens = {"token-a": TEST_USER, "token-b": OTHER_USER}
+
+    def verify_oauth2_token(token, request, audience):
+        if token not in tokens:
+            raise ValueError("imza doğrulanamadı")
+        return {"iss": "https://accounts.google.com", "email": tokens[token], "email_verified": True,
+                "exp": time.time() + 3600, "aud": audience}
+
+    monkeypatch.setattr(auth.id_token, "verify_oauth2_token", verify_oauth2_token)
+    monkeypatch.setattr(api_module.id_token_verifier, "client_id", "test-client")
+    monkeypatch.setattr(api_module.id_token_verifier, "cache", type(api_module.id_token_verifier.cache)())
+    api_module.app.dependency_overrides.clear()
+    return {email: {"Authorization": f"Bearer {token}"} for token, email in tokens.items()}
+
+
+def store(api, user_email, mail_id, category="Sosyal"):
+    mail = {"id": mail_id, "user_email": user_email, "content": None, "snippet": "", "subject": mail_id,
+            "date": datetime(2026, 10, 1), "predicted_class": category, "confidence_score": 0.9}
+    api.mails_collection.bulk_write([upsert_operation(mail)])
+
+
+def test_requests_without_verified_token_are_rejected(google_tokens, client):
+    assert client.get("/mails/all").status_code == 401
+    assert client.get("/mails/all", headers={"Authorization": "Bearer sahte"}).status_code == 401
+    # Eski sürümdeki başlık artık kimlik belirlemez
+    assert client.get("/mails/all", headers={"X-User-Email": TEST_USER}).status_code == 401
+
+
+def test_users_only_see_and_delete_their_own_mails(api_module, google_tokens, client):
+    store(api_module, TEST_USER, "ortak")
+    store(api_module, OTHER_USER, "ortak")
+    api_module.mails_collection.insert_one({"id": "eski", "user_email": None, "predicted_class": "Sosyal"})
+
+    ids = [mail["id"] for mail in client.get("/mails/all", headers=google_tokens[TEST_USER]).json()["mails"]]
+    assert ids == ["ortak"]
+
+    response = client.request("DELETE", "/mails/delete-selected", json={"mail_ids": ["ortak", "eski"]},
+                              headers=google_tokens[OTHER_USER])
+    assert response.json()["deleted_count"] == 1
+    # Aynı Gmail ID'li mail diğer hesapta ve sahipsiz eski kayıt yerinde kalır
+    assert api_module.mails_collection.count_documents({"id": "ortak", "user_email": TEST_USER}) == 1
+    assert api_module.mails_collection.count_documents({"id": "eski"}) == 1
+    assert api_module.deleted_mails_collection.count_documents({"user_email": OTHER_USER, "mail_id": "ortak"}) == 1
+
+
+def test_complete_auth_rejects_unknown_state(api_module, google_tokens, client):
+    api_module.session_collection.insert_one({"email": TEST_USER, "oauth_state": "beklenen"})
+    response = client.post("/mails/complete_auth", params={"code": "kod", "state": "baska"},
+                           headers=google_tokens[TEST_USER])
+    assert response.status_code == 400
+
+
+def test_legacy_documents_are_assigned_to_one_owner(api_module):
+    api_module.mails_collection.insert_one({"id": "eski", "user_email": None})
+    api_module.deleted_mails_collection.insert_one({"mail_id": "silinmis"})
+
+    counts = assign_legacy_owner(api_module.db, TEST_USER)
+
+    assert counts == {"mails": 1, "deleted_mails": 1}
+    assert api_module.mails_collection.find_one({"id": "eski"})["user_email"] == TEST_USER
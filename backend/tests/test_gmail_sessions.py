@@ -0,0 +1,51 @@
+import threading
+
+import mongomock
+
+import gmail_sessions
+from gmail_sessions import GmailSessionManager
+from conftest import TEST_USER
+
+
+class FakeCredentials:
+    expiry = None
+    valid = True
+    refresh_token = None
+
+
+def manager(monkeypatch):
+    monkeypatch.setattr(gmail_sessions, "build", lambda *args, **kwargs: object())
+    sessions = GmailSessionManager(mongomock.MongoClient().db.user_sessions)
+    sessions.credentials[TEST_USER] = FakeCredentials()
+    return sessions
+
+
+def in_thread(function):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(function()))
+    thread.start()
+    thread.join()
+    return results[0]
+
+
+def test_services_are_cached_per_thread(monkeypatch):
+    sessions = manager(monkeypatch)
+    service = sessions.get_service(TEST_USER)
+    assert sessions.get_service(TEST_USER) is service
+    # Başka thread kendi servisini kurar; bitince önbelleği thread'le birlikte atılır
+    assert in_thread(lambda: sessions.get_service(TEST_USER)) is not service
+    assert sessions.get_service(TEST_USER) is service
+
+
+def test_new_credentials_replace_services_in_every_thread(monkeypatch):
+    sessions = manager(monkeypatch)
+    service = sessions.get_service(TEST_USER)
+    monkeypatch.setattr(FakeCredentials, "to_json", lambda self: "{}", raising=False)
+    in_thread(lambda: sessions.save_credentials(TEST_USER, FakeCredentials()))
+    assert sessions.get_service(TEST_USER) is not service
+
+
+def test_expired_services_are_rebuilt(monkeypatch):
+    sessions = manager(monkeypatch)
+    sessions.service_ttl = 0
+    assert sessions.get_service(TEST_USER) is not sessions.get_service(TEST_USER)
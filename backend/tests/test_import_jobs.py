@@ -0,0 +1,151 @@
+import threading
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from import_jobs import ImportJobManager, ImportProgress
+
+
+def wait_for(manager, job_id):
+    manager.shutdown(wait=True)
+    return manager.collection.find_one({"job_id": job_id}, {"_id": 0})
+
+
+def test_concurrent_submits_share_one_active_job():
+    collection = mongomock.MongoClient().db.import_jobs
+    # Aynı koleksiyonu kullanan iki süreç (worker)
+    managers = [ImportJobManager(collection), ImportJobManager(collection)]
+    release = threading.Event()
+    jobs = []
+
+    def run_import(user_email, progress=None):
+        release.wait(5)
+        return {"message": "tamam"}
+
+    def submit(manager):
+        jobs.append(manager.submit("kullanici@example.com", run_import)["job_id"])
+
+    threads = [threading.Thread(target=submit, args=(managers[index % 2],)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(jobs)) == 1
+    assert collection.count_documents({"user_email": "kullanici@example.com"}) == 1
+
+    release.set()
+    for manager in managers:
+        manager.shutdown(wait=True)
+    finished = collection.find_one({"job_id": jobs[0]})
+    assert finished["status"] == "completed"
+    assert "active" not in finished
+
+    # Biten işten sonra yeni iş açılabilir
+    manager = ImportJobManager(collection)
+    assert manager.submit("kullanici@example.com", run_import)["job_id"] != jobs[0]
+    wait_for(manager, jobs[0])
+
+
+def test_progress_written_from_many_threads_ends_with_final_counts():
+    collection = mongomock.MongoClient().db.import_jobs
+    manager = ImportJobManager(collection)
+
+    def run_import(user_email, progress=None):
+        def work():
+            for _ in range(200):
+                progress.increment("fetched")
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {"message": "tamam"}
+
+    job = manager.submit("kullanici@example.com", run_import)
+    finished = wait_for(manager, job["job_id"])
+
+    assert finished["status"] == "completed"
+    assert finished["progress"] == {**dict.fromkeys(ImportProgress.STAGES, 0), "fetched": 800}
+
+
+def test_new_manager_leaves_running_jobs_of_live_managers_alone():
+    collection = mongomock.MongoClient().db.import_jobs
+    first = ImportJobManager(collection)
+    started, release = threading.Event(), threading.Event()
+
+    def run_import(user_email, progress=None):
+        started.set()
+        release.wait(5)
+        return {"message": "tamam"}
+
+    job = first.submit("kullanici@example.com", run_import)
+    assert started.wait(5)
+
+    # Yeni bir worker / replika başlar
+    second = ImportJobManager(collection)
+    running = collection.find_one({"job_id": job["job_id"]})
+    assert running["status"] == "running"
+    assert running["active"] is True
+    assert second.submit("kullanici@example.com", run_import)["job_id"] == job["job_id"]
+
+    # İlk süreç ölür: kira yenilenmez ve süresi dolar
+    first.stop_event.set()
+    collection.update_one({"job_id": job["job_id"]}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+    replacement = second.submit("kullanici@example.com", lambda user_email, progress=None: {"message": "tamam"})
+
+    assert replacement["job_id"] != job["job_id"]
+    failed = collection.find_one({"job_id": job["job_id"]})
+    assert failed["status"] == "failed"
+    assert "active" not in failed
+    release.set()
+    first.shutdown(wait=True)
+    second.shutdown(wait=True)
+
+
+def test_run_waits_for_the_active_job_before_importing():
+    collection = mongomock.MongoClient().db.import_jobs
+    manager = ImportJobManager(collection)
+    release = threading.Event()
+    running, overlaps, calls = [0], [], []
+    lock = threading.Lock()
+
+    def run_import(user_email, progress=None, name=None):
+        with lock:
+            running[0] += 1
+            overlaps.append(running[0])
+            calls.append(name)
+        if name == "arka plan":
+            release.wait(5)
+        with lock:
+            running[0] -= 1
+        return {"message": name}
+
+    background = manager.submit("kullanici@example.com", run_import, name="arka plan")
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(manager.run("kullanici@example.com", run_import, name="push")))
+    waiter.start()
+    waiter.join(0.3)
+    assert waiter.is_alive()
+
+    release.set()
+    waiter.join(5)
+
+    assert results == [{"message": "push"}]
+    assert calls == ["arka plan", "push"]
+    assert max(overlaps) == 1
+    assert collection.find_one({"job_id": background["job_id"]})["status"] == "completed"
+    manager.shutdown(wait=True)
+
+
+def test_run_raises_the_import_error():
+    manager = ImportJobManager(mongomock.MongoClient().db.import_jobs)
+
+    def run_import(user_email, progress=None):
+        raise RuntimeError("Gmail erişilemedi")
+
+    with pytest.raises(RuntimeError, match="Gmail erişilemedi"):
+        manager.run("kullanici@example.com", run_import)
+    assert manager.collection.find_one({})["status"] == "failed"
+    manager.shutdown(wait=True)
@@ -0,0 +1,43 @@
+import pytest
+
+import categorize_mails
+from import_pipeline import ImportPipeline
+from fake_gmail import FakeGmailService
+from bench_mime_parser import synthetic_corpus
+
+
+class RecordingClassifier:
+    def __init__(self):
+        self.contents = []
+
+    def classify_mails(self, contents):
+        self.contents.extend(contents)
+        return [
+            {"predicted_class": "İş/Profesyonel", "confidence_score": 0.9, "all_scores": {"İş/Profesyonel": 0.9}}
+            for _ in contents
+        ]
+
+
+def run_pipeline(fetch_mode, size=12):
+    service = FakeGmailService(synthetic_corpus(4), size)
+    stored = []
+
+    def write_batch(mails):
+        stored.extend(mails)
+        return len(mails), 0
+
+    pipeline = ImportPipeline(lambda: service, write_batch, classifier=RecordingClassifier(),
+                              fetch_batch_size=5, fetch_mode=fetch_mode)
+    pipeline.run(f"msg{index:07d}" for index in range(size))
+    return service, stored
+
+
+@pytest.mark.parametrize("fetch_mode", ["full", "metadata"])
+def test_model_classifies_every_mail_with_its_body(fetch_mode, monkeypatch):
+    monkeypatch.setattr(categorize_mails, "get_sender_rules", lambda: None)
+
+    service, stored = run_pipeline(fetch_mode)
+
+    assert len(stored) == 12
+    assert all(mail["content"] is not None for mail in stored)
+    assert service.calls["get_full"] == 12
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+from conftest import TEST_USER
+from mail_storage import upsert_operation, migrate_mail_dates
+
+
+def insert_mails(api, count, category="Sosyal", start=datetime(2026, 10, 1, 12, 0)):
+    mails = []
+    for index in range(count):
+        mails.append({
+            "id": f"m{index:03d}",
+            "user_email": TEST_USER,
+            "content": None,
+            "snippet": f"snippet {index}",
+            # Her iki mail aynı tarihi paylaşır ki imleçteki id sırası da sınansın
+            "date": start - timedelta(hours=index // 2),
+            "predicted_class": category,
+            "confidence_score": 0.9,
+            "sender": "a@example.com",
+            "subject": f"konu {index}",
+        })
+    api.mails_collection.bulk_write([upsert_operation(mail) for mail in mails])
+    return mails
+
+
+def read_all_pages(client, category, limit):
+    ids, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(f"/mails/{category}", params=params)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        ids += [mail["id"] for mail in page["mails"]]
+        pages += 1
+        cursor = page["next_cursor"]
+        if not cursor:
+            return ids, pages
+
+
+def test_cursor_pagination_visits_every_mail_once(api_module, client):
+    mails = insert_mails(api_module, 7)
+
+    ids, pages = read_all_pages(client, "all", limit=2)
+
+    expected = [mail["id"] for mail in sorted(mails, key=lambda mail: (mail["date"], mail["id"]), reverse=True)]
+    assert ids == expected
+    assert pages == 4
+
+
+def test_cursor_pagination_within_category(api_module, client):
+    insert_mails(api_module, 5, category="Sosyal")
+    api_module.mails_collection.update_one({"id": "m002"}, {"$set": {"predicted_class": "Diğer"}})
+
+    ids, _ = read_all_pages(client, "Sosyal", limit=2)
+
+    assert ids == ["m001", "m000", "m003", "m004"]
+
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.get("/mails/all", params={"cursor": "bozuk"})
+    assert response.status_code == 400
+
+
+def test_cursor_pagination_with_legacy_string_dates(api_module, client):
+    insert_mails(api_module, 3)
+    # Tarih taşıma işinden önce kaydedilmiş mailler
+    for mail_id, date in (("eski1", "2025-01-02"), ("eski2", "2025-01-02"), ("eski3", "2024-12-31")):
+        api_module.mails_collection.insert_one({"id": mail_id, "user_email": TEST_USER, "date": date,
+                                                "predicted_class": "Sosyal", "subject": mail_id})
+
+    for limit in (1, 2, 3, 4):
+        ids, _ = read_all_pages(client, "all", limit=limit)
+        assert ids == ["m001", "m000", "m002", "eski2", "eski1", "eski3"]
+
+
+def test_string_dates_are_migrated(api_module):
+    api_module.mails_collection.insert_one({"id": "eski", "user_email": TEST_USER, "date": "2025-01-02"})
+
+    assert migrate_mail_dates(api_module.mails_collection) == 1
+    assert api_module.mails_collection.find_one({"id": "eski"})["date"] == datetime(2025, 1, 2)
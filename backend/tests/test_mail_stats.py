@@ -0,0 +1,193 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import TEST_USER
+from fake_gmail import FakeGmailService
+from bench_mime_parser import synthetic_corpus
+from mail_stats import StatsCounters, count_pipeline, counters_to_counts
+
+
+def test_daily_volume_is_grouped_by_day(client, api_module):
+    today = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    yesterday = today - timedelta(days=1)
+    api_module.mails_collection.insert_many([
+        {"id": "m1", "user_email": TEST_USER, "date": today.replace(hour=1), "predicted_class": "Reklam", "confidence_score": 0.9},
+        {"id": "m2", "user_email": TEST_USER, "date": today.replace(hour=23), "predicted_class": "Reklam", "confidence_score": 0.7},
+        {"id": "m3", "user_email": TEST_USER, "date": yesterday, "predicted_class": "İş/Profesyonel", "confidence_score": 0.8},
+        {"id": "m4", "user_email": TEST_USER, "date": today - timedelta(days=40), "predicted_class": "Reklam", "confidence_score": 0.6},
+    ])
+
+    response = client.get("/mails/stats", params={"days": 30})
+
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["total"] == 4
+    assert stats["daily"] == [
+        {"date": yesterday.strftime("%Y-%m-%d"), "count": 1},
+        {"date": today.strftime("%Y-%m-%d"), "count": 2},
+    ]
+
+
+CATEGORIES = ["Reklam", "İş/Profesyonel", "Abonelik Bildirimleri"]
+
+
+class CyclingClassifier:
+    def __init__(self):
+        self.calls = 0
+
+    def classify_mails(self, contents):
+        results = []
+        for _ in contents:
+            category = CATEGORIES[self.calls % len(CATEGORIES)]
+            self.calls += 1
+            results.append({"predicted_class": category, "confidence_score": 0.9, "all_scores": {category: 0.9}})
+        return results
+
+
+@pytest.fixture
+def counters_api(client, api_module, monkeypatch):
+    import categorize_mails
+    import import_pipeline
+
+    service = FakeGmailService(synthetic_corpus(4), 12, email_address=TEST_USER)
+    classifier = CyclingClassifier()
+    monkeypatch.setattr(api_module, "stats_counters", StatsCounters(api_module.db["mail_stats"]))
+    monkeypatch.setattr(api_module.session_manager, "get_service", lambda user_email: service)
+    monkeypatch.setattr(import_pipeline, "get_classifier", lambda: classifier)
+    monkeypatch.setattr(categorize_mails, "get_sender_rules", lambda: None)
+    monkeypatch.setattr(api_module, "get_sender_rules", lambda: None)
+    return api_module, service
+
+
+def stored_counts(api_module):
+    groups = api_module.mails_collection.aggregate(count_pipeline({"user_email": TEST_USER}))
+    return {group["_id"]: group["count"] for group in groups}
+
+
+def counter_counts(api_module):
+    return counters_to_counts(list(api_module.db["mail_stats"].find({"user_email": TEST_USER}, {"_id": 0})))
+
+
+def test_counters_follow_import_delete_and_history_removal(client, counters_api):
+    api_module, service = counters_api
+    # Sayaçlar boş posta kutusu için kurulur, sonrası artımlı güncellenir
+    assert client.get("/mails/stats/counts").json()["source"] == "aggregate"
+
+    api_module.run_import(TEST_USER)
+    assert sum(stored_counts(api_module).values()) == 12
+    assert counter_counts(api_module) == stored_counts(api_module)
+
+    response = client.request("DELETE", "/mails/delete-selected", json={"mail_ids": ["msg0000000", "msg0000001", "msg0000001", "yok"]})
+    assert response.json()["deleted_count"] == 2
+    assert counter_counts(api_module) == stored_counts(api_module)
+
+    # Zaten silinmiş mailler sayaçları tekrar düşürmez
+    response = client.request("DELETE", "/mails/delete-selected", json={"mail_ids": ["msg0000000", "msg0000001"]})
+    assert response.json()["deleted_count"] == 0
+    assert counter_counts(api_module) == stored_counts(api_module)
+
+    # Gmail'de silinen mailler artımlı senkronizasyonda kaldırılır
+    service.history_id += 1
+    service.history_log.append({
+        "id": str(service.history_id),
+        "messagesDeleted": [{"message": {"id": msg_id}} for msg_id in ("msg0000002", "msg0000003", "msg0000000")]
+    })
+    result = api_module.run_import(TEST_USER)
+    assert result["removed"] == 2
+    assert sum(stored_counts(api_module).values()) == 8
+    assert counter_counts(api_module) == stored_counts(api_module)
+
+    response = client.get("/mails/stats/counts")
+    assert response.json() == {"total": 8, "categories": stored_counts(api_module), "source": "counters"}
+
+
+def test_rebuild_overwrites_counters_in_place(client, counters_api):
+    api_module, _ = counters_api
+    api_module.run_import(TEST_USER)
+    api_module.db["mail_stats"].insert_one({"user_email": TEST_USER, "category": "Eski Kategori", "count": 5})
+    api_module.stats_counters.apply(TEST_USER, {"Reklam": 3})
+
+    for _ in range(2):
+        response = client.get("/mails/stats/counts", params={"rebuild": "true"})
+        assert response.status_code == 200
+        assert response.json()["source"] == "aggregate"
+
+    assert counter_counts(api_module) == stored_counts(api_module)
+
+
+def test_rebuild_keeps_increment_between_count_and_write(client, counters_api):
+    api_module, _ = counters_api
+    api_module.run_import(TEST_USER)
+    client.get("/mails/stats/counts")
+    counters = api_module.stats_counters
+    category = next(iter(stored_counts(api_module)))
+    calls = []
+
+    def count_mails():
+        counts = api_module.count_categories(TEST_USER)
+        if not calls:
+            # Aggregation bittikten sonra, sayaçlar yazılmadan önce bir import mail ekler
+            mail = {**api_module.mails_collection.find_one({"predicted_class": category}, {"_id": 0}), "id": "yeni"}
+            api_module.mails_collection.insert_one(mail)
+            counters.apply(TEST_USER, {category: 1})
+        calls.append(counts)
+        return counts
+
+    counts = counters.rebuild(TEST_USER, count_mails)
+    assert len(calls) == 2
+    assert counts == stored_counts(api_module)
+    assert counter_counts(api_module) == stored_counts(api_module)
+
+
+def test_counters_are_reconciled_periodically(client, counters_api):
+    api_module, _ = counters_api
+    api_module.run_import(TEST_USER)
+    assert client.get("/mails/stats/counts").json()["source"] == "aggregate"
+    assert client.get("/mails/stats/counts").json()["source"] == "counters"
+
+    # Sayaçla birlikte güncellenmemiş bir silme (ör. yarıda kalan istek) kaymaya yol açar
+    api_module.mails_collection.delete_one({"user_email": TEST_USER, "id": "msg0000000"})
+    api_module.db["mail_stats"].update_one(
+        {"user_email": TEST_USER, "category": "__initialized__"},
+        {"$set": {"rebuilt_at": datetime.utcnow() - timedelta(days=1)}}
+    )
+    response = client.get("/mails/stats/counts")
+    assert response.json()["source"] == "aggregate"
+    assert counter_counts(api_module) == stored_counts(api_module)
+
+
+class ConcurrentDeletion:
+    """Silme isteği mailleri işaretlemeden hemen önce başka bir isteğin aynı maili silmesini taklit eder."""
+
+    def __init__(self, collection, sync_collection, mail_id):
+        self.collection = collection
+        self.sync_collection = sync_collection
+        self.mail_id = mail_id
+
+    async def update_many(self, *args, **kwargs):
+        self.sync_collection.delete_one({"user_email": TEST_USER, "id": self.mail_id})
+        return await self.collection.update_many(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+
+def test_delete_decrements_only_mails_it_removed(client, counters_api, monkeypatch):
+    api_module, _ = counters_api
+    api_module.run_import(TEST_USER)
+    client.get("/mails/stats/counts")
+    expected = dict(counter_counts(api_module))
+    expected[api_module.mails_collection.find_one({"id": "msg0000005"})["predicted_class"]] -= 1
+    monkeypatch.setattr(api_module, "async_mails_collection", ConcurrentDeletion(
+        api_module.async_mails_collection, api_module.mails_collection, "msg0000004"
+    ))
+
+    response = client.request("DELETE", "/mails/delete-selected", json={"mail_ids": ["msg0000004", "msg0000005"]})
+
+    # msg0000004'ü diğer istek sildi (ve kendi sayacını düşürdü); bu istek sadece msg0000005'i düşürür
+    assert response.json()["deleted_count"] == 1
+    assert response.json()["failed_ids"] == ["msg0000004 (bulunamadı)"]
+    assert counter_counts(api_module) == expected
+    tombstones = api_module.db["deleted_mails"].find({"user_email": TEST_USER}, {"mail_id": 1, "_id": 0})
+    assert [item["mail_id"] for item in tombstones] == ["msg0000005"]
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import push_ingestion
+from fake_pubsub_publisher import make_push_envelope
+
+PUSH_URL = "/mails/push/gmail"
+
+
+@pytest.fixture
+def notifications(api_module, monkeypatch):
+    received = []
+    monkeypatch.setattr(api_module, "PUSH_TOPIC", "projects/test/topics/gmail")
+    monkeypatch.setattr(api_module.push_ingestor, "notify", lambda user_email, history_id: received.append((user_email, history_id)))
+    return received
+
+
+def test_push_is_disabled_without_verification(client, notifications, monkeypatch):
+    monkeypatch.setattr(push_ingestion, "PUSH_VERIFICATION_TOKEN", "")
+    monkeypatch.setattr(push_ingestion, "PUSH_AUDIENCE", "")
+
+    response = client.post(PUSH_URL, json=make_push_envelope("kurban@example.com", 10))
+
+    assert response.status_code == 503
+    assert client.post("/mails/watch").status_code == 503
+    assert notifications == []
+
+
+def test_push_requires_verification_token(client, notifications, monkeypatch):
+    monkeypatch.setattr(push_ingestion, "PUSH_VERIFICATION_TOKEN", "gizli")
+    monkeypatch.setattr(push_ingestion, "PUSH_AUDIENCE", "")
+    envelope = make_push_envelope("kullanici@example.com", 42)
+
+    assert client.post(PUSH_URL, json=envelope).status_code == 403
+    assert client.post(PUSH_URL, params={"token": "yanlis"}, json=envelope).status_code == 403
+    assert client.post(PUSH_URL, params={"token": "gizli"}, json=envelope).status_code == 204
+    assert notifications == [("kullanici@example.com", 42)]
+
+
+def test_push_verifies_pubsub_oidc_token(client, notifications, monkeypatch):
+    service_account = "push@proje.iam.gserviceaccount.com"
+    monkeypatch.setattr(push_ingestion, "PUSH_VERIFICATION_TOKEN", "")
+    monkeypatch.setattr(push_ingestion, "PUSH_AUDIENCE", "https://backend/mails/push/gmail")
+    monkeypatch.setattr(push_ingestion, "PUSH_SERVICE_ACCOUNT", service_account)
+
+    def verify(token, request, audience):
+        if token != "pubsub-jwt" or audience != "https://backend/mails/push/gmail":
+            raise ValueError("imza geçersiz")
+        return {"iss": "https://accounts.google.com", "email": service_account, "email_verified": True}
+
+    monkeypatch.setattr(push_ingestion.id_token, "verify_oauth2_token", verify)
+    envelope = make_push_envelope("kullanici@example.com", 7)
+
+    assert client.post(PUSH_URL, json=envelope).status_code == 403
+    assert client.post(PUSH_URL, json=envelope, headers={"Authorization": "Bearer sahte"}).status_code == 403
+    assert client.post(PUSH_URL, json=envelope, headers={"Authorization": "Bearer pubsub-jwt"}).status_code == 204
+    assert notifications == [("kullanici@example.com", 7)]
+
+
+def test_watch_renewal_lease_has_single_holder(api_module):
+    leases = api_module.db["leases"]
+    leases.delete_many({})
+
+    assert push_ingestion.acquire_lease(leases, "gmail-watch-renewal", "worker-1", 60)
+    assert not push_ingestion.acquire_lease(leases, "gmail-watch-renewal", "worker-2", 60)
+    # Kilidi tutan süreç süresini uzatabilir
+    assert push_ingestion.acquire_lease(leases, "gmail-watch-renewal", "worker-1", 60)
+
+    leases.update_one({"_id": "gmail-watch-renewal"}, {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+    assert push_ingestion.acquire_lease(leases, "gmail-watch-renewal", "worker-2", 60)
+    assert leases.find_one({"_id": "gmail-watch-renewal"})["owner"] == "worker-2"
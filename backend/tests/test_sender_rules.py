@@ -0,0 +1,108 @@
+import mongomock
+
+from categorize_mails import classify_chunk
+from mail_classifier import SUBSCRIPTION_LABEL
+from sender_rules import SenderRules, _parent_domains, MODEL_SOURCE, LIST_UNSUBSCRIBE_SOURCE
+
+WORK_LABEL = "İş ve Profesyonel İletişim"
+AD_LABEL = "Pazarlama ve Reklam (Tanıtımlar)"
+
+
+class FixedScoreClassifier:
+    def __init__(self, scores):
+        self.scores = scores
+
+    def classify_mails(self, contents):
+        predicted_class = max(self.scores, key=self.scores.get)
+        return [
+            {"predicted_class": predicted_class, "confidence_score": self.scores[predicted_class], "all_scores": dict(self.scores)}
+            for _ in contents
+        ]
+
+
+def mail(sender, list_unsubscribe=False):
+    return {"id": "m1", "sender": sender, "subject": "Konu", "snippet": "", "content": "Merhaba",
+            "date": "2025-01-02", "list_unsubscribe": list_unsubscribe}
+
+
+def test_domain_rules_stop_at_registrable_domain():
+    assert _parent_domains("bildirim@mail.banka.com.tr") == ["mail.banka.com.tr", "banka.com.tr"]
+    assert _parent_domains("a@e.linkedin.com") == ["e.linkedin.com", "linkedin.com"]
+    assert _parent_domains("a@news.bbc.co.uk") == ["news.bbc.co.uk", "bbc.co.uk"]
+
+    rules = SenderRules(domain_rules={"com.tr": AD_LABEL, "banka.com.tr": WORK_LABEL})
+    assert rules.domain_rules == {"banka.com.tr": WORK_LABEL}
+    assert rules.match(mail("Banka <bildirim@mail.banka.com.tr>")) == (WORK_LABEL, "rule:domain")
+    assert rules.match(mail("Dükkan <info@dukkan.com.tr>")) is None
+
+
+def test_list_unsubscribe_is_a_hint_for_the_model():
+    rules = SenderRules()
+    assert rules.match(mail("Ekip <ekip@firma.com>", list_unsubscribe=True)) is None
+
+    # Model emin olduğunda kararı değişmez
+    confident = FixedScoreClassifier({WORK_LABEL: 0.8, SUBSCRIPTION_LABEL: 0.1, AD_LABEL: 0.1})
+    result = next(classify_chunk(confident, [mail("Ekip <ekip@firma.com>", list_unsubscribe=True)], rules=rules))
+    assert result["predicted_class"] == WORK_LABEL
+    assert result["classified_by"] == LIST_UNSUBSCRIBE_SOURCE
+    assert abs(sum(result["all_scores"].values()) - 1.0) < 1e-9
+
+    # Kararsız sonuçta abonelik lehine döner
+    undecided = FixedScoreClassifier({WORK_LABEL: 0.4, SUBSCRIPTION_LABEL: 0.35, AD_LABEL: 0.25})
+    result = next(classify_chunk(undecided, [mail("Bülten <bulten@firma.com>", list_unsubscribe=True)], rules=rules))
+    assert result["predicted_class"] == SUBSCRIPTION_LABEL
+
+    result = next(classify_chunk(undecided, [mail("Bülten <bulten@firma.com>")], rules=rules))
+    assert result["predicted_class"] == WORK_LABEL
+    assert result["classified_by"] == MODEL_SOURCE
+
+
+def learned_mails(user_email, sender, category, count=3):
+    return [
+        {"id": f"{user_email}-{index}", "user_email": user_email, "sender": sender, "predicted_class": category,
+         "confidence_score": 0.95, "classified_by": MODEL_SOURCE}
+        for index in range(count)
+    ]
+
+
+def test_learned_senders_are_scoped_per_user():
+    collection = mongomock.MongoClient().db.mails
+    collection.insert_many(learned_mails("a@example.com", "Dükkan <kampanya@dukkan.com>", AD_LABEL))
+    collection.insert_many(learned_mails("b@example.com", "Dükkan <kampanya@dukkan.com>", WORK_LABEL, count=1))
+    rules = SenderRules(collection=collection)
+
+    rules.refresh_learned("a@example.com")
+    rules.refresh_learned("b@example.com")
+
+    assert rules.match(mail("kampanya@dukkan.com"), "a@example.com") == (AD_LABEL, "rule:learned")
+    assert rules.match(mail("kampanya@dukkan.com"), "b@example.com") is None
+    assert rules.match(mail("kampanya@dukkan.com")) is None
+
+
+class FailingCollection:
+    def __init__(self, collection):
+        self.collection = collection
+        self.failures = 1
+
+    def aggregate(self, pipeline):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("bağlantı koptu")
+        return self.collection.aggregate(pipeline)
+
+
+def test_failed_refresh_does_not_abort_and_is_retried():
+    collection = mongomock.MongoClient().db.mails
+    collection.insert_many(learned_mails("a@example.com", "kampanya@dukkan.com", AD_LABEL))
+    rules = SenderRules(collection=FailingCollection(collection))
+
+    rules.refresh_learned("a@example.com")
+    assert "a@example.com" not in rules.learned_at
+
+    rules.refresh_learned("a@example.com")
+    assert rules.match(mail("kampanya@dukkan.com"), "a@example.com") == (AD_LABEL, "rule:learned")
+    learned_at = rules.learned_at["a@example.com"]
+
+    # Yenileme süresi dolmadan tekrar hesaplanmaz
+    rules.refresh_learned("a@example.com")
+    assert rules.learned_at["a@example.com"] == learned_at
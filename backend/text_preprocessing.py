@@ -0,0 +1,106 @@
+import os
+import re
+from html.parser import HTMLParser
+
+
+# Sınıflandırıcıya gönderilecek en fazla karakter; ~4 karakter/token ile modelin 512 token bütçesine denk gelir
+MAX_CLASSIFY_CHARS = int(os.getenv("CLASSIFY_MAX_CHARS", "2000"))
+
+# İçeriği görünmeyen etiketler tamamen atlanır
+SKIPPED_TAGS = {'script', 'style', 'head', 'title', 'noscript', 'template', 'svg', 'xml'}
+# Satır sonu üreten blok etiketler
+BLOCK_TAGS = {
+    'p', 'div', 'br', 'tr', 'li', 'ul', 'ol', 'table', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'blockquote', 'section', 'article', 'header', 'footer', 'hr', 'pre'
+}
+
+HTML_PATTERN = re.compile(r'<(?:html|body|div|p|br|table|span|a|img|!doctype)\b', re.IGNORECASE)
+
+# Alıntılanan önceki mesajın başladığını gösteren satırlar
+REPLY_HEADER_PATTERNS = [
+    re.compile(r'^On .{0,200} wrote:\s*$', re.IGNORECASE),
+    re.compile(r'^.{0,200} tarihinde .{0,200} (şunu )?yazdı:\s*$', re.IGNORECASE),
+    re.compile(r'^-{2,}\s*(Original Message|Orijinal Mesaj|Özgün İleti)\s*-{2,}\s*$', re.IGNORECASE),
+    re.compile(r'^_{10,}\s*$'),
+]
+# İmza bloğunun başladığını gösteren satırlar
+SIGNATURE_PATTERNS = [
+    re.compile(r'^--\s*$'),
+    re.compile(r'^(Sent from my|iPhone\'umdan gönderildi|Android cihazımdan gönderildi)', re.IGNORECASE),
+]
+
+
+class _VisibleTextParser(HTMLParser):
+    """HTML'den sadece kullanıcının göreceği metni toplar."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth = max(self.skip_depth - 1, 0)
+        elif tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+
+
+def html_to_text(html):
+    """HTML içeriği görünen metne dönüştürür; stil, script ve takip pikselleri atılır."""
+    parser = _VisibleTextParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        # Bozuk HTML'de etiketleri kaba şekilde temizle
+        return re.sub(r'<[^>]+>', ' ', html)
+    return ''.join(parser.parts)
+
+
+def strip_quotes_and_signature(text):
+    """Alıntılanan önceki mesajları ve imza bloğunu metinden çıkarır."""
+    kept_lines = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if any(pattern.match(stripped) for pattern in REPLY_HEADER_PATTERNS + SIGNATURE_PATTERNS):
+            break
+        if stripped.startswith('>'):
+            continue
+        kept_lines.append(stripped)
+    # Mesajın tamamı alıntıysa orijinal metin korunur
+    return '\n'.join(kept_lines) if any(kept_lines) else text
+
+
+def truncate(text, max_chars=MAX_CLASSIFY_CHARS):
+    """Metni kelime sınırında max_chars karaktere kısaltır."""
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(' ', 0, max_chars)
+    return text[:cut if cut > 0 else max_chars]
+
+
+def prepare_for_classification(content, max_chars=MAX_CLASSIFY_CHARS):
+    """
+    Mail içeriğini sınıflandırmaya hazırlar: HTML'i görünen metne çevirir, alıntı ve
+    imzaları atar, boşlukları sadeleştirir ve modelin bütçesine göre kısaltır.
+    """
+    if not content:
+        return ''
+    text = html_to_text(content) if HTML_PATTERN.search(content) else content
+    text = strip_quotes_and_signature(text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return truncate(text, max_chars)
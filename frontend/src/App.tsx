@@ -12,6 +12,7 @@ import Menu from '@mui/material/Menu';
 import MenuItem from '@mui/material/MenuItem';
 import TrashEmailList from './components/TrashEmailList';
 import MagicCursor from './components/MagicCursor';
+import { authHeaders, ID_TOKEN_KEY } from './authHeaders';
 
 interface User {
   name: string;
@@ -66,14 +67,39 @@ function App() {
     
     setIsConnecting(true);
     try {
+      // Google yetkilendirme sayfasından dönüldüyse kodu backend'de token'a çevir
+      const params = new URLSearchParams(window.location.search);
+      const code = params.get('code');
+      const state = params.get('state');
+      if (code && state) {
+        window.history.replaceState(null, '', window.location.pathname);
+        const authResponse = await fetch(`https://backend-service-116708036805.europe-west1.run.app/mails/complete_auth?${new URLSearchParams({ code, state }).toString()}`, {
+          method: 'POST',
+          headers: authHeaders(),
+        });
+        if (!authResponse.ok) {
+          const errorData = await authResponse.json();
+          setSnackbarMessage(`Gmail yetkilendirme hatası: ${errorData.detail || 'Yetkilendirme tamamlanamadı'}. Lütfen tekrar giriş yapın.`);
+          setSnackbarSeverity('error');
+          setSnackbarOpen(true);
+          return;
+        }
+      }
+
       // 1. Gmail bağlantısı
       const response = await fetch('https://backend-service-116708036805.europe-west1.run.app/mails/connect_mail', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ user_email: user?.email }),
+        headers: authHeaders(),
       });
       
       if (response.ok) {
+        const connection = await response.json();
+        if (connection.auth_url) {
+          // Gmail erişimi henüz onaylanmamış; Google yetkilendirme sayfasına yönlendir
+          window.location.assign(connection.auth_url);
+          return;
+        }
+
         setSnackbarMessage('Gmail hesabınıza başarıyla bağlandınız. E-postalar alınıyor...');
         setSnackbarSeverity('success');
         setSnackbarOpen(true);
@@ -82,6 +108,7 @@ function App() {
         try {
           const importResponse = await fetch('https://backend-service-116708036805.europe-west1.run.app/mails/insert_mails_into_database', {
             method: 'POST',
+            headers: authHeaders(),
           });
           
           if (importResponse.ok) {
@@ -144,6 +171,7 @@ function App() {
   const handleLogout = () => {
     setUser(null);
     localStorage.removeItem('user');
+    localStorage.removeItem(ID_TOKEN_KEY);
     setSnackbarMessage('Başarıyla çıkış yaptınız');
     setSnackbarSeverity('info');
     setSnackbarOpen(true);
@@ -2,6 +2,7 @@ import React from 'react';
 import { Box, Paper, Typography, Link } from '@mui/material';
 import { GoogleLogin } from '@react-oauth/google';
 import { jwtDecode } from 'jwt-decode';
+import { ID_TOKEN_KEY } from './authHeaders';
 
 interface User {
   name: string;
@@ -31,6 +32,7 @@ const Login: React.FC<LoginProps> = ({ onLogin }) => {
           onSuccess={credentialResponse => {
             if (credentialResponse.credential) {
               const decoded = jwtDecode<User>(credentialResponse.credential);
+              localStorage.setItem(ID_TOKEN_KEY, credentialResponse.credential);
               onLogin(decoded);
             }
           }}
@@ -0,0 +1,7 @@
+// Backend isteklerinde kullanıcıyı doğrulamak için Google ile girişte alınan ID token gönderilir
+export const ID_TOKEN_KEY = 'id_token';
+
+export const authHeaders = (headers: Record<string, string> = {}): Record<string, string> => {
+  const token = localStorage.getItem(ID_TOKEN_KEY);
+  return token ? { ...headers, Authorization: `Bearer ${token}` } : headers;
+};
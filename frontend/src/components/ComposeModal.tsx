@@ -12,6 +12,7 @@ import LockIcon from '@mui/icons-material/Lock';
 import FormatColorTextIcon from '@mui/icons-material/FormatColorText';
 import MoreVertIcon from '@mui/icons-material/MoreVert';
 import DeleteIcon from '@mui/icons-material/Delete';
+import { authHeaders } from '../authHeaders';
 
 interface User {
   name: string;
@@ -68,6 +69,7 @@ const ComposeModal: React.FC<ComposeModalProps> = ({ open, onClose, user }) => {
       
       const response = await fetch(`https://backend-service-116708036805.europe-west1.run.app/mails/send_mail?${queryParams.toString()}`, {
         method: 'POST',
+        headers: authHeaders(),
       });
 
       if (response.ok) {
@@ -20,6 +20,7 @@ import DeleteIcon from '@mui/icons-material/Delete';
 import ArchiveIcon from '@mui/icons-material/Archive';
 import MarkEmailReadIcon from '@mui/icons-material/MarkEmailRead';
 import EmailRow from './EmailRow';
+import { authHeaders } from '../authHeaders';
 
 interface Email {
   id: string;
@@ -97,37 +98,50 @@ const EmailList: React.FC<EmailListProps> = ({ selectedCategory, searchQuery = '
   const [isRefreshing, setIsRefreshing] = useState(false);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   
   const itemsPerPage = 50;
 
+  // API response'u dönüştür (liste görünümünde gövde gelmez, mail açılınca ayrıca çekilir)
+  const formatMails = (mails: any[]): Email[] => mails.map((mail: any) => ({
+    id: mail.id || mail._id || String(Math.random()),
+    sender: mail.sender || 'Bilinmeyen Gönderici',
+    subject: mail.subject || mail.snippet || 'Konu yok',
+    snippet: mail.snippet || '',
+    date: mail.date || 'Tarih yok',
+    read: false,
+    predicted_class: mail.predicted_class || selectedCategory,
+    content: mail.content || mail.body || ''
+  }));
+
+  // Backend'den bir sayfa mail verisi çek
+  const fetchMailPage = async (cursor: string | null) => {
+    const params = new URLSearchParams({ limit: String(itemsPerPage) });
+    if (cursor) {
+      params.set('cursor', cursor);
+    }
+    const response = await fetch(
+      `https://backend-service-116708036805.europe-west1.run.app/mails/${selectedCategory}?${params.toString()}`,
+      { headers: authHeaders() }
+    );
+    
+    if (!response.ok) {
+      const errorData = await response.json();
+      throw new Error(errorData.detail || 'Mailler alınırken bir hata oluştu');
+    }
+    
+    return response.json();
+  };
+
   // Backend'den mail verilerini çek
   const fetchMails = async () => {
     setLoading(true);
     setError(null);
     try {
-      const response = await fetch(
-        `https://backend-service-116708036805.europe-west1.run.app/mails/${selectedCategory}`
-      );
-      
-      if (!response.ok) {
-        const errorData = await response.json();
-        throw new Error(errorData.detail || 'Mailler alınırken bir hata oluştu');
-      }
-      
-      const data = await response.json();
-      
-      // API response'u dönüştür
-      const formattedEmails = data.mails.map((mail: any) => ({
-        id: mail.id || mail._id || String(Math.random()),
-        sender: mail.sender || 'Bilinmeyen Gönderici',
-        subject: mail.subject || mail.snippet || 'Konu yok',
-        date: mail.date || 'Tarih yok',
-        read: false,
-        predicted_class: mail.predicted_class || selectedCategory,
-        content: mail.content || mail.body || ''
-      }));
-      
-      setEmails(formattedEmails);
+      const data = await fetchMailPage(null);
+      setEmails(formatMails(data.mails));
+      setNextCursor(data.next_cursor || null);
+      setPage(1);
     } catch (error) {
       console.error('Mail fetch error:', error);
       setError(error instanceof Error ? error.message : 'Mailler alınamadı');
@@ -177,6 +191,7 @@ const EmailList: React.FC<EmailListProps> = ({ selectedCategory, searchQuery = '
       // Sonra yeni mailleri veritabanına ekle
       const importResponse = await fetch('https://backend-service-116708036805.europe-west1.run.app/mails/insert_mails_into_database', {
         method: 'POST',
+        headers: authHeaders(),
       });
       
       if (importResponse.ok) {
@@ -196,10 +211,21 @@ const EmailList: React.FC<EmailListProps> = ({ selectedCategory, searchQuery = '
     }
   };
 
-  const handleNextPage = () => {
+  const handleNextPage = async () => {
     if (page * itemsPerPage < filteredEmails.length) {
       setPage(prev => prev + 1);
       showSnackbar('Sonraki sayfa gösteriliyor');
+    } else if (nextCursor) {
+      // Yüklü mailler bittiyse sıradaki sayfayı sunucudan al
+      try {
+        const data = await fetchMailPage(nextCursor);
+        setEmails(prev => [...prev, ...formatMails(data.mails)]);
+        setNextCursor(data.next_cursor || null);
+        setPage(prev => prev + 1);
+        showSnackbar('Sonraki sayfa gösteriliyor');
+      } catch (error) {
+        showSnackbar('Sonraki sayfa alınamadı');
+      }
     }
   };
 
@@ -232,7 +258,7 @@ const EmailList: React.FC<EmailListProps> = ({ selectedCategory, searchQuery = '
     try {
       const response = await fetch('https://backend-service-116708036805.europe-west1.run.app/mails/delete-selected', {
         method: 'DELETE',
-        headers: { 'Content-Type': 'application/json' },
+        headers: authHeaders({ 'Content-Type': 'application/json' }),
         body: JSON.stringify({ mail_ids: selected }),
       });
       
@@ -276,7 +302,7 @@ const EmailList: React.FC<EmailListProps> = ({ selectedCategory, searchQuery = '
       // Mailleri arşivle (silmek yerine)
       const response = await fetch('https://backend-service-116708036805.europe-west1.run.app/mails/archive-selected', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: authHeaders({ 'Content-Type': 'application/json' }),
         body: JSON.stringify({ mail_ids: selected }),
       });
       
@@ -328,6 +354,7 @@ const EmailList: React.FC<EmailListProps> = ({ selectedCategory, searchQuery = '
       const matchesSearch = !searchQuery || 
         email.subject.toLowerCase().includes(searchQuery.toLowerCase()) ||
         email.sender.toLowerCase().includes(searchQuery.toLowerCase()) ||
+        (email.snippet && email.snippet.toLowerCase().includes(searchQuery.toLowerCase())) ||
         (email.content && email.content.toLowerCase().includes(searchQuery.toLowerCase()));
         
       // Her durumda arama kriterine göre filtrele
@@ -539,7 +566,7 @@ const EmailList: React.FC<EmailListProps> = ({ selectedCategory, searchQuery = '
             <span>
               <IconButton 
                 size="small" 
-                disabled={page * itemsPerPage >= filteredEmails.length}
+                disabled={page * itemsPerPage >= filteredEmails.length && !nextCursor}
                 onClick={handleNextPage}
               >
                 <KeyboardArrowRightIcon fontSize="small" />
@@ -25,6 +25,7 @@ import ReplyIcon from '@mui/icons-material/Reply';
 import ForwardIcon from '@mui/icons-material/Forward';
 import StarBorderIcon from '@mui/icons-material/StarBorder';
 import DOMPurify from 'dompurify';
+import { authHeaders } from '../authHeaders';
 
 interface EmailRowProps {
   id: string;
@@ -54,6 +55,23 @@ const EmailRow: React.FC<EmailRowProps> = ({
   originalSubject
 }) => {
   const [openDialog, setOpenDialog] = useState(false);
+  const [loadedContent, setLoadedContent] = useState<string | null>(null);
+  const mailContent = content || loadedContent || '';
+
+  // Liste görünümünde gövde gelmediği için mail açıldığında ayrıca çekilir
+  const fetchMailContent = async () => {
+    try {
+      const response = await fetch(`https://backend-service-116708036805.europe-west1.run.app/mails/detail/${id}`, {
+        headers: authHeaders(),
+      });
+      if (response.ok) {
+        const mail = await response.json();
+        setLoadedContent(mail.content || mail.body || mail.snippet || '');
+      }
+    } catch (error) {
+      console.error('Mail content fetch error:', error);
+    }
+  };
   
   const handleCheckboxClick = (e: React.MouseEvent) => {
     e.stopPropagation();
@@ -65,6 +83,9 @@ const EmailRow: React.FC<EmailRowProps> = ({
       onMarkAsRead();
     }
     setOpenDialog(true);
+    if (!content && loadedContent === null) {
+      fetchMailContent();
+    }
   };
   
   const handleCloseDialog = () => {
@@ -367,7 +388,7 @@ const EmailRow: React.FC<EmailRowProps> = ({
                 whiteSpace: 'normal',
                 wordBreak: 'break-word',
               }}
-              dangerouslySetInnerHTML={{ __html: content ? DOMPurify.sanitize(content) : '' }}
+              dangerouslySetInnerHTML={{ __html: mailContent ? DOMPurify.sanitize(mailContent) : '' }}
             />
             {/* Ekler */}
           {attachment && (
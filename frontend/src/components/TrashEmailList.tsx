@@ -19,6 +19,7 @@ import DeleteIcon from '@mui/icons-material/Delete';
 import RestoreFromTrashIcon from '@mui/icons-material/RestoreFromTrash';
 import MarkEmailReadIcon from '@mui/icons-material/MarkEmailRead';
 import EmailRow from './EmailRow';
+import { authHeaders } from '../authHeaders';
 
 interface Email {
   id: string;
@@ -53,7 +54,9 @@ const TrashEmailList: React.FC<TrashEmailListProps> = ({ searchQuery = '' }) =>
     setLoading(true);
     setError(null);
     try {
-      const response = await fetch('https://backend-service-116708036805.europe-west1.run.app/mails/trash');
+      const response = await fetch('https://backend-service-116708036805.europe-west1.run.app/mails/trash', {
+        headers: authHeaders(),
+      });
       
       if (!response.ok) {
         const errorData = await response.json();
@@ -154,7 +157,7 @@ const TrashEmailList: React.FC<TrashEmailListProps> = ({ searchQuery = '' }) =>
     try {
       const response = await fetch('https://backend-service-116708036805.europe-west1.run.app/mails/permanently-delete', {
         method: 'DELETE',
-        headers: { 'Content-Type': 'application/json' },
+        headers: authHeaders({ 'Content-Type': 'application/json' }),
         body: JSON.stringify({ mail_ids: selected }),
       });
       
@@ -197,7 +200,7 @@ const TrashEmailList: React.FC<TrashEmailListProps> = ({ searchQuery = '' }) =>
     try {
       const response = await fetch('https://backend-service-116708036805.europe-west1.run.app/mails/restore-from-trash', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: authHeaders({ 'Content-Type': 'application/json' }),
         body: JSON.stringify({ mail_ids: selected }),
       });
       